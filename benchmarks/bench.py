@@ -0,0 +1,124 @@
+"""
+Benchmarks for workspace loading, the mkdocs nav hook and push.
+
+A synthetic workspace of the given size is generated in a temporary
+directory. The push benchmarks run against a local stand-in for the Frappe
+API (see benchmarks/server.py) and report the number of HTTP calls made.
+
+Usage:
+
+    $ python -m benchmarks.bench --courses 20 --chapters 5 --lessons 10
+    $ python -m benchmarks.bench --latency 0.05 --jobs 8
+"""
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+from build import nav
+from build.workspace import Lesson, Workspace, parse_cache
+from build.profiling import profiler
+from .synthetic import generate_workspace
+from .server import FakeFrappeServer
+
+def measure(func, repeat, setup=None):
+    """Runs func repeat times and returns the times taken in seconds.
+    """
+    times = []
+    for i in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+def print_result(name, times, extra=""):
+    median = statistics.median(times) * 1000
+    best = min(times) * 1000
+    print(f"{name:40} {median:10.2f} ms {best:10.2f} ms  {extra}")
+
+def bench_workspace(root, repeat):
+    names = Workspace(root).list_courses()
+
+    def read_courses():
+        w = Workspace(root)
+        for name in names:
+            w.read_course(name)
+
+    print_result("Workspace.read_course (cold)", measure(read_courses, repeat, setup=parse_cache.clear))
+    print_result("Workspace.read_course (warm)", measure(read_courses, repeat))
+
+    w = Workspace(root)
+    chapters = [c for name in names for c in w.read_course(name).chapters]
+    lessons = [(c, c.course.root / str(p)) for c in chapters for p in c.lessons]
+
+    def read_lessons():
+        for chapter, path in lessons:
+            Lesson.from_file(chapter, path)
+
+    print_result(f"Lesson.from_file x {len(lessons)} (cold)", measure(read_lessons, repeat, setup=parse_cache.clear))
+    print_result(f"Lesson.from_file x {len(lessons)} (warm)", measure(read_lessons, repeat))
+
+    def clear_nav():
+        parse_cache.clear()
+        nav._nav_cache.clear()
+
+    def on_files():
+        nav.on_files([], {"docs_dir": str(root)})
+
+    print_result("nav.on_files (cold)", measure(on_files, repeat, setup=clear_nav))
+    print_result("nav.on_files (warm)", measure(on_files, repeat))
+
+def bench_push(root, latency, jobs):
+    try:
+        from build.api import API
+    except ImportError as e:
+        print(f"skipping push benchmarks: {e}")
+        return
+
+    server = FakeFrappeServer(latency=latency).start()
+    server.frappe.add_user("benchmark@example.com", "benchmark")
+    os.environ.update({
+        "MON_SCHOOL_URL": server.url,
+        "MON_SCHOOL_API_KEY": "key",
+        "MON_SCHOOL_API_SECRET": "secret"
+    })
+    profiler.enable()
+    try:
+        w = Workspace(root)
+        courses = [w.read_course(name) for name in w.list_courses()]
+        api = API(jobs=jobs)
+        for name in ["push (new)", "push (no changes)"]:
+            profiler.reset()
+            with contextlib.redirect_stdout(io.StringIO()):
+                times = measure(lambda: api.push(courses=courses), 1)
+            print_result(f"{name} --jobs {jobs}", times, f"{profiler.http_calls} http calls")
+    finally:
+        profiler.enabled = False
+        server.stop()
+
+@click.command()
+@click.option("--courses", default=10, show_default=True, help="number of courses")
+@click.option("--chapters", default=5, show_default=True, help="number of chapters in each course")
+@click.option("--lessons", default=10, show_default=True, help="number of lessons in each chapter")
+@click.option("--repeat", default=5, show_default=True, help="number of times to run each benchmark")
+@click.option("--latency", default=0.0, show_default=True, help="latency of the local server, in seconds")
+@click.option("-j", "--jobs", default=1, show_default=True, help="number of parallel requests to make in push")
+def main(courses, chapters, lessons, repeat, latency, jobs):
+    """Runs the benchmarks on a synthetic workspace.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        root = generate_workspace(Path(tmp) / "courses", courses, chapters, lessons)
+        print(f"workspace: {courses} courses x {chapters} chapters x {lessons} lessons")
+        print(f"{'benchmark':40} {'median':>13} {'best':>13}")
+        bench_workspace(root, repeat)
+        bench_push(root, latency, jobs)
+
+if __name__ == "__main__":
+    main()
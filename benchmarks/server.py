@@ -0,0 +1,147 @@
+"""
+A local stand-in for the Frappe HTTP API of mon.school, for benchmarks.
+
+It implements just enough of the API used by monctl: `get_list` and
+`get_doc` through /api/resource, the `mon_school.api.save_document` method
+and file uploads. The documents are kept in memory and an optional latency
+is added to every request to simulate a remote server.
+"""
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+from build.sync import CHILD_TABLES
+
+# `tabDocType`.field as alias
+RE_FIELD = re.compile(r"^(?:`tab(?P<table>[^`]+)`\.)?(?P<field>\w+)(?: as (?P<alias>\w+))?$")
+
+class FakeFrappe:
+    """In-memory store of the documents.
+    """
+    def __init__(self):
+        # doctype -> name -> doc
+        self.docs = {}
+        # (doctype, name) of the docs saved, in order
+        self.saved = []
+        # (doctype, name) of the docs that fail to save, for tests
+        self.failing = set()
+        self.lock = threading.Lock()
+
+    def add_user(self, name, username):
+        self.docs.setdefault("User", {})[name] = {"name": name, "username": username}
+
+    def save_document(self, doctype, name, doc):
+        if (doctype, name) in self.failing:
+            raise Exception(f"failed to save {doctype} {name}")
+        with self.lock:
+            self.saved.append((doctype, name))
+            docs = self.docs.setdefault(doctype, {})
+            docs.setdefault(name, {"name": name}).update(doc)
+
+    def get_doc(self, doctype, name):
+        return self.docs.get(doctype, {}).get(name)
+
+    def get_list(self, doctype, fields, filters, limit_start=0, limit_page_length=20):
+        fields = [RE_FIELD.match(f.strip()).groupdict() for f in fields]
+        child_table = next((f["table"] for f in fields if f["table"] and f["table"] != doctype), None)
+
+        rows = []
+        for name, doc in sorted(self.docs.get(doctype, {}).items()):
+            if not all(self.match(doc, f) for f in filters):
+                continue
+
+            children = [None]
+            if child_table:
+                fieldname = next(c[0] for dt, c in CHILD_TABLES.items() if dt == doctype and c[1] == child_table)
+                children = [dict(row, idx=i+1) for i, row in enumerate(doc.get(fieldname) or [])] or [None]
+
+            for child in children:
+                row = {}
+                for f in fields:
+                    source = child if f["table"] == child_table and child_table else doc
+                    row[f["alias"] or f["field"]] = source and source.get(f["field"])
+                rows.append(row)
+        return rows[limit_start:limit_start+limit_page_length]
+
+    def match(self, doc, condition):
+        field, op, value = condition[-3:]
+        if op == "in":
+            return doc.get(field) in value
+        return doc.get(field) == value
+
+class RequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = unquote(url.path).split("/")
+        if parts[1:3] != ["api", "resource"]:
+            return self.send_json({"exc": f"not found: {url.path}"}, status=404)
+
+        self.server.wait()
+        frappe = self.server.frappe
+        if len(parts) == 5:
+            return self.send_json({"data": frappe.get_doc(parts[3], parts[4])})
+
+        params = parse_qs(url.query)
+        fields = json.loads(params.get("fields", ['["name"]'])[0])
+        filters = json.loads(params.get("filters", ["[]"])[0])
+        limit_start = int(params.get("limit_start", [0])[0])
+        limit_page_length = int(params.get("limit_page_length", [20])[0])
+        rows = frappe.get_list(parts[3], fields, filters, limit_start, limit_page_length)
+        self.send_json({"data": rows})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.wait()
+        if self.path == "/api/method/mon_school.api.save_document":
+            data = json.loads(body)
+            try:
+                self.server.frappe.save_document(data["doctype"], data["name"], data["doc"])
+            except Exception as e:
+                return self.send_json({"message": {"ok": False, "error": str(e)}})
+            self.send_json({"message": {"ok": True}})
+        elif self.path == "/api/method/upload_file":
+            self.send_json({"message": {"file_url": f"/files/{uuid.uuid4().hex}.png"}})
+        else:
+            self.send_json({"exc": f"not found: {self.path}"}, status=404)
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeFrappeServer(ThreadingHTTPServer):
+    """Serves a FakeFrappe on localhost, in a background thread.
+    """
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        super().__init__(("127.0.0.1", 0), RequestHandler)
+        self.frappe = FakeFrappe()
+        self.latency = latency
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
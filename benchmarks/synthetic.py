@@ -0,0 +1,65 @@
+"""
+Generates synthetic workspaces of a given size for benchmarks.
+"""
+from pathlib import Path
+import yaml
+
+PARAGRAPH = """\
+Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor
+incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, quis
+nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat.
+"""
+
+LESSON_TEMPLATE = """\
+---
+title: {title}
+include_in_preview: false
+---
+
+{body}
+"""
+
+def generate_workspace(root, courses=10, chapters=5, lessons=10, paragraphs=10):
+    """Generates a workspace at root with courses x chapters x lessons lessons.
+
+    Returns the root of the workspace.
+    """
+    root = Path(root)
+    body = "\n".join([PARAGRAPH] * paragraphs)
+    for i in range(courses):
+        name = f"course-{i}"
+        course_root = root / name
+        course_root.mkdir(parents=True)
+
+        course_chapters = []
+        for j in range(chapters):
+            chapter = f"chapter-{j}"
+            (course_root / chapter).mkdir()
+            paths = []
+            for k in range(lessons):
+                path = f"{chapter}/lesson-{j}-{k}.md"
+                title = f"Lesson {j}.{k}"
+                course_root.joinpath(path).write_text(LESSON_TEMPLATE.format(title=title, body=body))
+                paths.append(path)
+            course_chapters.append({
+                "name": chapter,
+                "title": f"Chapter {j}",
+                "description": f"Chapter {j} of course {i}",
+                "lessons": paths
+            })
+
+        data = {
+            "name": name,
+            "suffix": f"c{i}",
+            "title": f"Course {i}",
+            "short_introduction": f"Introduction to course {i}",
+            "description": f"Description of course {i}",
+            "instructor": "benchmark",
+            "is_published": True,
+            "upcoming": False,
+            "tags": ["benchmark"],
+            "video_link": None,
+            "chapters": course_chapters
+        }
+        course_root.joinpath("course.yml").write_text(yaml.safe_dump(data, sort_keys=False))
+    return root
@@ -5,14 +5,20 @@ monctl.api
 Client library to push courses to mon.school.
 """
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import urljoin
 
 import frontmatter
 from frappeclient import FrappeClient
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import yaml
 
-from .workspace import Lesson, Chapter, Course
+from .workspace import Course
+from .manifest import DEFAULT_SITE_URL
+from .sync import RemoteState, SyncPlan, PushSummary, make_plan
+from .profiling import profiler
 
 def _read_config_value(name, default=None):
     value = os.getenv(name) or default
@@ -22,30 +28,22 @@ def _read_config_value(name, default=None):
 
 def get_config():
     return {
-        "site_url": _read_config_value("MON_SCHOOL_URL", "https://mon.school/"),
+        "site_url": _read_config_value("MON_SCHOOL_URL", DEFAULT_SITE_URL),
         "api_key": _read_config_value("MON_SCHOOL_API_KEY"),
         "api_secret": _read_config_value("MON_SCHOOL_API_SECRET")
     }
 
-DEFAULTS = {
-    "LMS Course": {
-        "title": "-",
-        "short_introduction": "-",
-        "description": "-"
-    },
-    "Course Chapter": {
-        "title": "-",
-        "description": "-"
-    },
-    "Course Lesson": {
-        "title": "-",
-        "body": "-"
-    }
-}
+# responses that are retried, with exponential backoff
+RETRY_STATUS = [429, 500, 502, 503, 504]
+
+UPLOAD_FILE_PATH = "/api/method/upload_file"
 
 class API:
-    def __init__(self):
+    def __init__(self, jobs=1, manifest=None):
         self.config = get_config()
+        self.jobs = jobs
+        # manifest to record the uploaded files, to skip uploading them again
+        self.manifest = manifest
         self.frappe = self.get_frappe()
 
     def get_frappe(self):
@@ -55,24 +53,91 @@ class API:
 
         frappe = FrappeClient(url)
         frappe.authenticate(api_key, api_secret)
+
+        # the session is shared by all the workers, so the connection pool
+        # needs to have a connection for each of them
+        retry = Retry(total=5,
+            backoff_factor=0.5,
+            status_forcelist=RETRY_STATUS,
+            allowed_methods=None,
+            raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.jobs, max_retries=retry)
+        frappe.session.mount("http://", adapter)
+        frappe.session.mount("https://", adapter)
+
+        # uploads are not idempotent, retrying them could create duplicate files
+        upload_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.jobs, max_retries=0)
+        frappe.session.mount(url + UPLOAD_FILE_PATH, upload_adapter)
+        profiler.install(frappe.session)
         return frappe
 
     def save_document(self, doctype, name, doc):
-        #print("save_document", doctype, name, doc)
         data = {
             "doctype": doctype,
             "name": name,
             "doc": doc
         }
-        old_doc = self.get_doc(doctype, name)
-        old_doc = old_doc and self.subdict(old_doc, doc.keys()) or {}
-        old_doc = self.trim_tables(old_doc)
-
-        if old_doc == doc:
-            print(doctype, name, "no changes found")
-        else:
-            print(doctype, name, "saving...")
-            return self.invoke_method("mon_school.api.save_document", data=data)
+        return self.invoke_method("mon_school.api.save_document", data=data)
+
+    def push(self, courses=(), lessons=(), dry_run=False) -> SyncPlan:
+        """Pushes the courses and lessons to mon.school.
+
+        The remote state is fetched in bulk and only the docs that are missing
+        or changed are saved. When dry_run is true, the plan is printed and
+        nothing is saved.
+
+        The changes are saved stage by stage, using upto `self.jobs` parallel
+        requests within each stage. When a change fails, the remaining changes
+        of that course are skipped.
+        """
+        with profiler.phase("fetch"):
+            remote = RemoteState.fetch(self.frappe, courses=courses, lessons=lessons)
+        with profiler.phase("diff"):
+            plan = make_plan(remote, courses=courses, lessons=lessons)
+        if dry_run:
+            plan.print()
+            return plan
+
+        summary = PushSummary(plan)
+        with profiler.phase("upload"), ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            for stage in plan.get_stages():
+                changes = [c for c in stage if not summary.is_failed(c.course)]
+                for change, error in zip(changes, executor.map(self.try_apply_change, changes)):
+                    summary.add(change, error)
+
+            courses = [c for c in courses if not summary.is_failed(c.name) and c.preview_image]
+            errors = executor.map(lambda c: self.try_update_course_preview_image(c, remote), courses)
+            for course, error in zip(courses, errors):
+                if error:
+                    summary.add_error(course.name, f"preview_image {course.preview_image}", error)
+
+        summary.print()
+        if summary.failed:
+            raise Exception(f"Failed to push {len(summary.failed)} courses")
+        return plan
+
+    def try_apply_change(self, change):
+        """Applies the change and returns the error, if any.
+        """
+        try:
+            self.apply_change(change)
+        except Exception as e:
+            print("ERROR:", change.doctype, change.name, e)
+            return e
+
+    def try_update_course_preview_image(self, course, remote):
+        """Updates the preview image of the course and returns the error, if any.
+        """
+        try:
+            self.update_course_preview_image(course, remote)
+        except Exception as e:
+            print("ERROR:", "preview_image", course.name, e)
+            return e
+
+    def apply_change(self, change):
+        print(change.doctype, change.name, "saving...")
+        with profiler.doc(change.doctype, change.name):
+            return self.save_document(change.doctype, change.name, change.doc)
 
     def add_attachment(self, filename, doctype, docname, fieldname):
         files = {"file": open(filename, "rb")}
@@ -83,29 +148,12 @@ class API:
             "fieldname": fieldname,
             "folder": "Home"
         }
-        url = urljoin(self.frappe.url, "/api/method/upload_file")
+        url = urljoin(self.frappe.url, UPLOAD_FILE_PATH)
         r = self.frappe.session.post(url, files=files, data=data)
+        if not r.ok:
+            raise Exception(f"Failed to upload {filename}: {r.status_code} {r.reason}")
         return r.json()['message']['file_url']
 
-    def trim_tables(self, doc):
-        def trim(d):
-            ignore = "name owner creation modified modified_by parent parentfield parenttype idx docstatus doctype".split()
-            return {k: v for k, v in d.items() if k not in ignore}
-
-        for key, value in doc.items():
-            if isinstance(value, list):
-                doc[key] = [trim(v) for v in value]
-        return doc
-
-    def subdict(self, d, keys):
-        return {k: d[k] for k in keys if k in d}
-
-    def get_doc(self, doctype, name):
-        return self.frappe.get_doc(doctype, name)
-
-    def exists(self, doctype, name):
-        return bool(self.get_doc(doctype, name))
-
     def invoke_method(self, method, data):
         url = self.frappe.url + "/api/method/" + method
         result = self.frappe.session.post(url, json=data).json()
@@ -119,59 +167,30 @@ class API:
         else:
             raise Exception(message.get("error") or f"unknown error: {message}")
 
-    def update_course(self, course: Course):
-        self.ensure_doc("LMS Course", course.name)
-        for chapter in course.chapters:
-            self.ensure_doc("Course Chapter", chapter.docname, course=course.name)
-
-        doc = course.get_doc()
-        doc['instructor'] = self.resolve_username(doc["instructor"])
-        self.save_document("LMS Course", course.name, doc)
+    def update_course_preview_image(self, course: Course, remote: RemoteState=None):
+        """Uploads the preview image of the course.
 
-        for chapter in course.chapters:
-            self.update_chapter(chapter)
+        The image prepared by prepare-images is uploaded when it is
+        up-to-date, otherwise the original image is uploaded.
 
-        self.update_course_preview_image(course)
-
-    def update_chapter(self, chapter: Chapter):
-        doc = chapter.get_doc()
-        self.ensure_doc("Course Chapter", doc['name'], course=doc['course'])
-        for lesson in doc["lessons"]:
-            name = lesson["lesson"]
-            self.ensure_doc("Course Lesson", name=name, title=name, chapter=doc["name"])
-
-        self.save_document("Course Chapter", doc['name'], doc)
-
-        for lesson in chapter.get_lessons():
-            self.update_lesson(lesson)
-
-    def resolve_username(self, username):
-        rows = self.frappe.get_list("User", fields=['name'], filters={"username": username})
-        if not rows:
-            return "Administrator"
-        else:
-            return rows[0]["name"]
-
-    def update_lesson(self, lesson: Lesson):
-        course_name = lesson.chapter.course.name
-        chapter_name = lesson.chapter.docname
-        doc = lesson.get_doc()
-
-        self.ensure_doc("LMS Course", course_name)
-        self.ensure_doc("Course Chapter", chapter_name, course=course_name)
-        self.save_document("Course Lesson", doc['name'], doc)
-
-    def ensure_doc(self, doctype, name, **fields):
-        if not self.exists(doctype, name):
-            doc = dict(DEFAULTS[doctype], **fields)
-            self.save_document(doctype, name, doc)
-
-    def update_course_preview_image(self, course: Course):
+        When a manifest is available, the upload is skipped if the image hasn't
+        changed since it was last uploaded and the course still uses it.
+        """
         if course.preview_image:
-            path = str(course.root / course.preview_image)
+            from .image import get_prepared_preview
+            path = str(get_prepared_preview(course) or course.root / course.preview_image)
+            key = f"LMS Course/{course.name}/image"
+            upload = self.manifest and self.manifest.get_upload(key, path)
+            doc = remote and remote.get("LMS Course", course.name)
+            if upload and doc and doc.get("image") == upload["file_url"]:
+                print("preview_image unchanged", path)
+                return
+
             print("upload preview_image", path)
             file_url = self.add_attachment(path,
                 doctype="LMS Course",
                 docname=course.name,
                 fieldname="image")
             self.save_document("LMS Course", course.name, {"image": file_url})
+            if self.manifest:
+                self.manifest.mark_uploaded(key, path, file_url)
@@ -0,0 +1,204 @@
+"""
+monctl.archive
+~~~~~~~~~~~~~~
+
+Export and import the course catalog as a single archive.
+
+The archive is a gzip compressed file with one JSON record per line. Every
+course is written as a record with the course and its chapters, followed by
+one record for every lesson and every file (like the preview image) of the
+course. Records are written and read one at a time, so the memory used
+doesn't grow with the number of courses.
+
+    {"type": "course", "name": "python-primer", "title": ..., "chapters": [...]}
+    {"type": "lesson", "course": "python-primer", "path": "introduction/hello-world.md", ...}
+    {"type": "file", "course": "python-primer", "path": "preview-image.png", "data": "<base64>"}
+"""
+from __future__ import annotations
+import base64
+import gzip
+import json
+from pathlib import Path, PurePosixPath
+from typing import Iterator, List
+from urllib.parse import urljoin
+
+import yaml
+
+from .workspace import Lesson, Workspace
+from .sync import FIELDS, RemoteState, get_all, iter_pages
+
+def write_archive(path, records: Iterator[dict]):
+    """Writes the records to the archive and returns the number of records written.
+    """
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+def read_archive(path) -> Iterator[dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+def export_workspace(w: Workspace, names=None) -> Iterator[dict]:
+    """Yields the records of the courses in the workspace.
+    """
+    for name in names or sorted(w.list_courses()):
+        course = w.read_course(name)
+        yield dict(course.dict(), type="course")
+
+        for chapter in course.chapters:
+            for p in chapter.lessons:
+                path = course.root / str(p)
+                if not path.exists():
+                    continue
+                lesson = Lesson.from_file(chapter, path, cache=False)
+                yield dict(lesson.dict(), type="lesson", course=course.name, path=str(p))
+
+        files = [course.preview_image] if course.preview_image else []
+        images_dir = course.root / "_images"
+        if images_dir.is_dir():
+            files += [str(p.relative_to(course.root)) for p in sorted(images_dir.iterdir()) if p.is_file()]
+        for f in files:
+            path = course.root / f
+            if path.exists():
+                data = base64.b64encode(path.read_bytes()).decode("ascii")
+                yield {"type": "file", "course": course.name, "path": f, "data": data}
+
+def export_remote(frappe) -> Iterator[dict]:
+    """Yields the records of all the courses on mon.school.
+
+    The courses and chapters are fetched first and the lessons are then
+    streamed a page at a time. As the suffix of a course is not stored on
+    mon.school, it is taken from the name of its first chapter. The course
+    image is downloaded and written as the preview image of the course.
+    """
+    remote = RemoteState()
+    remote.fetch_docs(frappe, "LMS Course", [])
+    remote.fetch_docs(frappe, "Course Chapter", [])
+    courses = [doc for (doctype, name), doc in sorted(remote.docs.items()) if doctype == "LMS Course"]
+
+    instructors = sorted({c["instructor"] for c in courses if c["instructor"]})
+    rows = get_all(frappe, "User", ["name", "username"], [["name", "in", instructors]]) if instructors else []
+    usernames = {row["name"]: row["username"] for row in rows}
+
+    # chapter docname -> (course, chapter name, suffix)
+    chapters = {}
+    for course in courses:
+        suffix = get_suffix(course)
+        course_chapters = []
+        for row in course["chapters"]:
+            chapter = remote.get("Course Chapter", row["chapter"])
+            if not chapter:
+                continue
+            name = strip_suffix(chapter["name"], suffix)
+            chapters[chapter["name"]] = (course["name"], name, suffix)
+            course_chapters.append({
+                "name": name,
+                "title": chapter["title"],
+                "description": chapter["description"],
+                "lessons": [f"{name}/{strip_suffix(l['lesson'], suffix)}.md" for l in chapter["lessons"]]
+            })
+
+        image = course["image"] and download_file(frappe, course["image"])
+        preview_image = image and "preview-image" + PurePosixPath(course["image"]).suffix
+
+        yield {
+            "type": "course",
+            "name": course["name"],
+            "suffix": suffix,
+            "title": course["title"],
+            "short_introduction": course["short_introduction"],
+            "description": course["description"],
+            "instructor": usernames.get(course["instructor"], course["instructor"]),
+            "is_published": bool(course["is_published"]),
+            "upcoming": bool(course["upcoming"]),
+            "tags": [t for t in (course["tags"] or "").split(",") if t],
+            "video_link": course["video_link"],
+            "chapters": course_chapters,
+            "draft": False,
+            "preview_image": preview_image or None
+        }
+        if image:
+            yield {"type": "file", "course": course["name"], "path": preview_image, "data": image}
+
+    fields = ["name"] + FIELDS["Course Lesson"]
+    for page in iter_pages(frappe, "Course Lesson", fields, []):
+        for lesson in page:
+            if lesson["chapter"] not in chapters:
+                continue
+            course, chapter, suffix = chapters[lesson["chapter"]]
+            name = strip_suffix(lesson["name"], suffix)
+            yield {
+                "type": "lesson",
+                "course": course,
+                "path": f"{chapter}/{name}.md",
+                "name": name,
+                "title": lesson["title"],
+                "body": lesson["body"],
+                "include_in_preview": bool(lesson["include_in_preview"])
+            }
+
+def download_file(frappe, file_url):
+    """Returns the contents of the file on mon.school as base64, or None if
+    the download fails.
+    """
+    r = frappe.session.get(urljoin(frappe.url + "/", file_url))
+    if not r.ok:
+        print(f"WARNING: failed to download {file_url}: {r.status_code}")
+        return None
+    return base64.b64encode(r.content).decode("ascii")
+
+def get_suffix(course):
+    if course["chapters"]:
+        return course["chapters"][0]["chapter"].rsplit("-", 1)[-1]
+    return course["name"]
+
+def strip_suffix(docname, suffix):
+    if docname.endswith("-" + suffix):
+        return docname[:-len(suffix)-1]
+    return docname
+
+def import_archive(archive_path, root, force=False) -> List[str]:
+    """Writes the courses in the archive to the workspace at root.
+
+    Existing courses are not overwritten, unless force is true.
+
+    Returns the names of the courses written.
+    """
+    root = Path(root)
+    names = []
+    for record in read_archive(archive_path):
+        kind = record.pop("type")
+        if kind == "course":
+            path = get_path(root, record["name"], "course.yml")
+            if path.parent.exists() and not force:
+                raise Exception(f"Course {record['name']} already exists in {root}")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(yaml.safe_dump(record, sort_keys=False, allow_unicode=True))
+            names.append(record["name"])
+        elif kind in ("lesson", "file"):
+            path = get_path(root, record["course"], record["path"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if kind == "lesson":
+                path.write_text(format_lesson(record))
+            else:
+                path.write_bytes(base64.b64decode(record["data"]))
+    return names
+
+def get_path(root: Path, course, path):
+    """Returns the path of a file of the course, making sure it is inside root.
+    """
+    if course in ("", ".", "..") or "/" in course or "\\" in course:
+        raise Exception(f"Invalid course name in archive: {course}")
+    p = root / course / path
+    if not p.resolve().is_relative_to((root / course).resolve()):
+        raise Exception(f"Invalid path in archive: {course}/{path}")
+    return p
+
+def format_lesson(record):
+    meta = {"title": record["title"], "include_in_preview": record["include_in_preview"]}
+    meta = yaml.safe_dump(meta, sort_keys=False, allow_unicode=True)
+    return f"---\n{meta}---\n\n{record['body']}\n"
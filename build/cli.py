@@ -1,54 +1,208 @@
+import json
 import click
 from pathlib import Path
 from .api import API
+from .manifest import Manifest
+from .profiling import profiler
+from .validate import Report, validate_workspace
 from .workspace import Workspace
 
 @click.group()
-def cli():
+@click.option("--profile", is_flag=True, help="report the HTTP calls made and the time taken by each phase")
+@click.pass_context
+def cli(ctx, profile=False):
     """The CLI tool to manage courses on Mon School.
     """
-    pass
+    if profile:
+        profiler.reset()
+        profiler.enable()
+        ctx.call_on_close(profiler.print)
+
+def find_changes(w: Workspace, manifest: Manifest, names, force=False):
+    """Finds the courses and lessons that have changed since the last push.
+
+    Returns the courses whose course.yml has changed and the paths of the
+    changed lessons of the remaining courses. With force, all the courses
+    are considered as changed.
+    """
+    courses, lesson_paths = [], []
+    for name in names:
+        path = w.root / name / "course.yml"
+        if force or manifest.is_course_dirty(name, path):
+            courses.append(w.read_course(name))
+        else:
+            lesson_paths += manifest.get_dirty_lessons(name)
+    return courses, lesson_paths
 
 @cli.command()
 @click.option("--course", "course_name", help="course to push")
-def push(course_name=None):
+@click.option("--dry-run", is_flag=True, help="print the changes without pushing them")
+@click.option("--force", is_flag=True, help="push even the files that haven't changed since the last push")
+@click.option("-j", "--jobs", type=click.IntRange(1), default=1, show_default=True, help="number of parallel requests to make")
+@click.option("--validate", "validate_first", is_flag=True, help="validate the changed courses before pushing")
+def push(course_name=None, dry_run=False, force=False, jobs=1, validate_first=False):
     """Push the courses to Mon School.
 
-    If no course is specified, all courses are pushed.
+    If no course is specified, all courses are pushed. Only the files changed
+    since the last push are read, and only the courses, chapters and lessons
+    that are missing or changed on Mon School are saved.
     """
-    api = API()
     w = Workspace()
+    manifest = Manifest()
     if course_name:
         names = [course_name]
     else:
         names = w.list_courses()
 
-    for name in names:
-        course = w.read_course(name)
-        if not course.draft:
-            api.update_course(course)
+    if validate_first:
+        changed = [name for name in names
+            if force
+            or manifest.is_course_dirty(name, w.root / name / "course.yml")
+            or manifest.get_dirty_lessons(name)]
+        # all the courses are validated to find the duplicate docnames
+        # between the changed courses and the others
+        report = Report(validate_workspace(w.root).results, changed)
+        if not report.ok:
+            report.print()
+            raise click.ClickException("validation failed, nothing is pushed")
+
+    with profiler.phase("parse"):
+        courses, lesson_paths = find_changes(w, manifest, names, force=force)
+        lessons = [w.read_lesson(p) for p in lesson_paths]
+    push_changes(manifest, courses, lessons, dry_run=dry_run, jobs=jobs)
 
 @cli.command()
+@click.option("--dry-run", is_flag=True, help="print the changes without pushing them")
+@click.option("--force", is_flag=True, help="push even the lessons that haven't changed since the last push")
+@click.option("-j", "--jobs", type=click.IntRange(1), default=1, show_default=True, help="number of parallel requests to make")
 @click.argument("filenames", type=click.Path(exists=True), nargs=-1, required=True)
-def push_lesson(filenames):
+def push_lesson(filenames, dry_run=False, force=False, jobs=1):
     """Push on or more lessons to Mon School.
     """
-    api = API()
     w = Workspace()
-    for f in filenames:
-        lesson = w.read_lesson(Path(f))
-        api.update_lesson(lesson)
+    manifest = Manifest()
+    lessons = []
+    with profiler.phase("parse"):
+        for f in filenames:
+            path = Path(f)
+            course_path = path.parent.parent / "course.yml"
+            if (force
+                    or manifest.is_lesson_dirty(path)
+                    or manifest.is_course_dirty(course_path.parent.name, course_path)):
+                lessons.append(w.read_lesson(path))
+    push_changes(manifest, [], lessons, dry_run=dry_run, jobs=jobs)
+
+def push_changes(manifest: Manifest, courses, lessons, dry_run=False, jobs=1):
+    """Pushes the courses and lessons and records them in the manifest.
+    """
+    if courses or lessons:
+        api = API(jobs=jobs, manifest=manifest)
+        api.push(courses=[c for c in courses if not c.draft], lessons=lessons, dry_run=dry_run)
+    else:
+        print("no changes found")
+
+    if not dry_run:
+        for course in courses:
+            manifest.mark_course_pushed(course)
+        for lesson in lessons:
+            manifest.mark_lesson_pushed(lesson)
+    manifest.save()
 
 @cli.command()
-@click.argument("filenames", type=click.Path(exists=True), nargs=-1, required=True)
-def push_lesson(filenames):
-    """Push on or more lessons to Mon School.
+def status():
+    """Show the files that have changed since the last push.
     """
-    api = API()
     w = Workspace()
-    for f in filenames:
-        lesson = w.read_lesson(Path(f))
-        api.update_lesson(lesson)
+    manifest = Manifest()
+    courses, lesson_paths = find_changes(w, manifest, w.list_courses())
+    for course in courses:
+        print("modified:", course.root / "course.yml")
+        for chapter in course.chapters:
+            for p in chapter.lessons:
+                path = course.root / str(p)
+                if manifest.is_lesson_dirty(path):
+                    print("modified:", path)
+    for path in lesson_paths:
+        print("modified:", path)
+    manifest.save()
+
+@cli.command()
+@click.option("--course", "course_name", help="course to validate")
+@click.option("--json", "as_json", is_flag=True, help="print the report as JSON")
+@click.option("-j", "--jobs", type=click.IntRange(1), help="number of processes to use, defaults to the number of cores")
+def validate(course_name=None, as_json=False, jobs=None):
+    """Validate the courses without pushing them.
+
+    Checks that all the lessons exist and have valid frontmatter, that the
+    links and images in the lessons are not broken and that there are no
+    duplicate docnames. Exits with a non-zero status if any problems are found.
+    """
+    w = Workspace()
+    names = [course_name] if course_name else w.list_courses()
+    report = validate_workspace(w.root, names, jobs=jobs)
+    if as_json:
+        print(json.dumps(report.dict(), indent=2))
+    else:
+        report.print()
+    if not report.ok:
+        raise SystemExit(1)
+
+@cli.command()
+@click.argument("archive_path", metavar="ARCHIVE", type=click.Path())
+@click.option("--course", "course_name", help="course to export")
+@click.option("--remote", is_flag=True, help="export the courses on Mon School instead of the workspace")
+def export(archive_path, course_name=None, remote=False):
+    """Export the courses to a compressed JSON-lines archive.
+    """
+    from . import archive
+    if remote:
+        records = archive.export_remote(API().frappe)
+    else:
+        names = [course_name] if course_name else None
+        records = archive.export_workspace(Workspace(), names)
+    count = archive.write_archive(archive_path, records)
+    print(f"exported {count} records to {archive_path}")
+
+@cli.command("import")
+@click.argument("archive_path", metavar="ARCHIVE", type=click.Path(exists=True))
+@click.option("--root", required=True, help="directory to write the courses to")
+@click.option("--force", is_flag=True, help="overwrite the courses that already exist in root")
+@click.option("--push", "push_courses", is_flag=True, help="push the imported courses to Mon School")
+@click.option("-j", "--jobs", type=click.IntRange(1), default=1, show_default=True, help="number of parallel requests to make")
+def import_(archive_path, root, force=False, push_courses=False, jobs=1):
+    """Import the courses from an archive created by export.
+
+    The courses are written to the directory given by --root. Courses that
+    already exist there are not overwritten, unless --force is given. Note
+    that course.yml is written again from the archive, without comments.
+    With --push, the courses are then pushed to Mon School, one course at a
+    time.
+    """
+    from . import archive
+    names = archive.import_archive(archive_path, root, force=force)
+    print(f"imported {len(names)} courses to {root}")
+
+    if push_courses:
+        api = API(jobs=jobs)
+        w = Workspace(root)
+        for name in names:
+            course = w.read_course(name)
+            if not course.draft:
+                api.push(courses=[course])
+
+@cli.command()
+@click.option("--delay", default=0.3, show_default=True, help="seconds to wait for more changes before pushing")
+@click.option("-j", "--jobs", type=click.IntRange(1), default=1, show_default=True, help="number of parallel requests to make")
+def watch(delay, jobs=1):
+    """Watch the courses and push the changed lessons to Mon School.
+
+    A changed course.yml or preview image pushes the whole course.
+    """
+    from .watch import Watcher
+    manifest = Manifest()
+    api = API(jobs=jobs, manifest=manifest)
+    watcher = Watcher(api, Workspace(), manifest=manifest, delay=delay)
+    watcher.run()
 
 @cli.command()
 @click.option("--course", "course_name", help="course to generate", required=True)
@@ -68,5 +222,26 @@ def prepare_image(source_path, dest_path):
     from . import image
     image.prepare_image(source_path, dest_path)
 
+@cli.command()
+@click.option("--output", "output_dir", default=".monctl/images", show_default=True, help="directory to write the images to")
+@click.option("-j", "--jobs", type=click.IntRange(1), help="number of processes to use, defaults to the number of cores")
+def prepare_images(output_dir, jobs=None):
+    """Prepares the preview images and lesson images of all the courses.
+
+    Course preview images are resized as suitable for mon.school and lesson
+    images are scaled down if they are too large. Optimized PNG and WebP
+    variants of every image are written to the output directory. Images that
+    haven't changed since the last run are skipped.
+
+    push uploads the prepared preview images from the default output
+    directory. The lesson image variants are not used by push or by the
+    mkdocs site, which serve the originals from _images.
+    """
+    from . import image
+    w = Workspace()
+    tasks = image.find_images(w, output_dir)
+    processed, skipped = image.prepare_images(tasks, jobs=jobs)
+    print(f"{processed} images processed, {skipped} unchanged")
+
 def main():
     cli()
@@ -11,20 +11,153 @@ The sizes that are used in the mon school app are 348x168 and 350x200.
 
 To make the image work for both sizes, the image is resized to 340x170 and placed
 in the center of 350x200 image.
+
+The `prepare_images` function does the same for all the course preview images
+in the workspace, in parallel, and also produces optimized PNG and WebP
+variants of the images used in lessons. The outputs are cached, keyed on the
+hash of the source image and the parameters used to generate them, so that only
+the images that have changed are processed again. When pushing a course, the
+prepared preview image is uploaded instead of the original, if it is up-to-date.
 """
+from __future__ import annotations
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
 from PIL import Image
-import sys
 
-def prepare_image(source_path, dest_path):
-    """Takes the image provides at the `source_path` and resizes it as suitable for
-    mon.school and saves it to the `dest_path`."""
+PREVIEW_SIZE = (350, 200)
+PREVIEW_THUMBNAIL_SIZE = (340, 170)
+
+# lesson images larger than this are scaled down
+LESSON_IMAGE_SIZE = (1200, 1200)
+
+FORMATS = ["png", "webp"]
+WEBP_QUALITY = 85
+
+IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".gif"]
+
+CACHE_PATH = ".monctl/images.json"
+OUTPUT_DIR = ".monctl/images"
+
+def make_preview(im):
     # resize the given image to 340x170
-    im = Image.open(source_path)
-    im.thumbnail((340, 170))
+    im = im.copy()
+    im.thumbnail(PREVIEW_THUMBNAIL_SIZE)
 
     # and paste it in the center of a 350x200 image
-    im2 = Image.new(mode="RGBA", size=(350, 200), color=(0, 0, 0, 0))
+    im2 = Image.new(mode="RGBA", size=PREVIEW_SIZE, color=(0, 0, 0, 0))
     offset = (im2.width-im.width) // 2, (im2.height-im.height)//2
     im2.paste(im, offset)
-    im2.save(dest_path)
+    return im2
+
+def prepare_image(source_path, dest_path):
+    """Takes the image provides at the `source_path` and resizes it as suitable for
+    mon.school and saves it to the `dest_path`."""
+    im = make_preview(Image.open(source_path))
+    im.save(dest_path)
     print("created", dest_path)
+
+@dataclass
+class ImageTask:
+    """An image to be processed.
+
+    The outputs are written to `dest` with the extension of each format.
+    """
+    source: str
+    dest: str
+    # "preview" or "lesson"
+    kind: str
+
+    def get_params(self):
+        size = PREVIEW_SIZE if self.kind == "preview" else LESSON_IMAGE_SIZE
+        return {"kind": self.kind, "size": list(size), "formats": FORMATS, "webp_quality": WEBP_QUALITY}
+
+    def get_outputs(self):
+        return [f"{self.dest}.{fmt}" for fmt in FORMATS]
+
+def process_image(task: ImageTask):
+    im = Image.open(task.source)
+    if task.kind == "preview":
+        # images that are already prepared are only optimized
+        if im.size != PREVIEW_SIZE:
+            im = make_preview(im)
+    else:
+        im.thumbnail(LESSON_IMAGE_SIZE)
+
+    if im.mode not in ("RGB", "RGBA"):
+        im = im.convert("RGBA")
+
+    Path(task.dest).parent.mkdir(parents=True, exist_ok=True)
+    im.save(f"{task.dest}.png", optimize=True)
+    im.save(f"{task.dest}.webp", quality=WEBP_QUALITY, method=6)
+    return task
+
+def find_images(workspace, output_dir=OUTPUT_DIR) -> List[ImageTask]:
+    """Finds the course preview images and the lesson images of all the courses.
+    """
+    output_dir = Path(output_dir)
+    tasks = []
+    for name in sorted(workspace.list_courses()):
+        course = workspace.read_course(name)
+        if course.preview_image:
+            tasks.append(get_preview_task(course, output_dir))
+
+        images_dir = course.root / "_images"
+        if images_dir.is_dir():
+            for p in sorted(images_dir.iterdir()):
+                if p.suffix.lower() in IMAGE_EXTENSIONS:
+                    # the extension is kept, so that foo.png and foo.jpg don't collide
+                    tasks.append(ImageTask(str(p), str(output_dir / name / "_images" / p.name), "lesson"))
+    return tasks
+
+def get_preview_task(course, output_dir=OUTPUT_DIR) -> ImageTask:
+    source = course.root / course.preview_image
+    return ImageTask(str(source), str(Path(output_dir) / course.name / source.stem), "preview")
+
+def get_prepared_preview(course, output_dir=OUTPUT_DIR, cache_path=CACHE_PATH):
+    """Returns the path of the prepared PNG of the course preview image.
+
+    Returns None if the image hasn't been prepared or has changed since.
+    """
+    cache_path = Path(cache_path)
+    if not course.preview_image or not cache_path.exists():
+        return None
+    task = get_preview_task(course, output_dir)
+    key = {"source_hash": file_hash(task.source), "params": task.get_params()}
+    path = Path(f"{task.dest}.png")
+    if json.loads(cache_path.read_text()).get(task.dest) == key and path.exists():
+        return path
+
+def file_hash(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+def prepare_images(tasks: List[ImageTask], cache_path=CACHE_PATH, jobs=None):
+    """Processes the images in parallel, skipping the ones whose outputs are up-to-date.
+
+    Returns the number of images processed and skipped.
+    """
+    cache_path = Path(cache_path)
+    cache = json.loads(cache_path.read_text()) if cache_path.exists() else {}
+
+    pending, keys = [], {}
+    for task in tasks:
+        key = {"source_hash": file_hash(task.source), "params": task.get_params()}
+        if cache.get(task.dest) == key and all(Path(p).exists() for p in task.get_outputs()):
+            continue
+        keys[task.dest] = key
+        pending.append(task)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+            for task in executor.map(process_image, pending):
+                cache[task.dest] = keys[task.dest]
+                print("created", ", ".join(task.get_outputs()))
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_text(json.dumps(cache, indent=1, sort_keys=True))
+    return len(pending), len(tasks) - len(pending)
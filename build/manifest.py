@@ -0,0 +1,153 @@
+"""
+monctl.manifest
+~~~~~~~~~~~~~~~
+
+Local manifest of the files in the workspace and what was pushed from them.
+
+For every `course.yml` and lesson file, the manifest records the mtime, size
+and content hash. The hash is only recomputed when the mtime or size changes,
+so finding the changed files doesn't require reading them.
+
+For every course and lesson, it records the hash of the file that was last
+pushed to mon.school. A file is dirty when its hash is different from the
+last pushed hash.
+
+For every attachment uploaded, like the course preview image, it records the
+hash of the file and the url it was uploaded to.
+
+What was pushed is recorded for a single site. When the manifest is used with
+a different site, everything is considered as not pushed yet.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+MANIFEST_PATH = ".monctl/manifest.json"
+
+DEFAULT_SITE_URL = "https://mon.school/"
+
+def get_site_url():
+    return os.getenv("MON_SCHOOL_URL") or DEFAULT_SITE_URL
+
+class Manifest:
+    def __init__(self, path=MANIFEST_PATH, site_url=None):
+        self.path = Path(path)
+        # site the courses, lessons and uploads were pushed to
+        self.site_url = (site_url or get_site_url()).rstrip("/")
+        # path -> {"mtime": .., "size": .., "hash": ..}
+        self.files = {}
+        # course name -> {"path": .., "hash": .., "lessons": [path, ...],
+        #                 "preview_image": path, "preview_image_hash": ..}
+        self.courses = {}
+        # lesson path -> {"docname": .., "hash": ..}
+        self.lessons = {}
+        # "doctype/docname/fieldname" -> {"hash": .., "file_url": ..}
+        self.uploads = {}
+        self.load()
+
+    def load(self):
+        if self.path.exists():
+            data = json.loads(self.path.read_text())
+            self.files = data.get("files", {})
+            if data.get("site_url") != self.site_url:
+                return
+            self.courses = data.get("courses", {})
+            self.lessons = data.get("lessons", {})
+            self.uploads = data.get("uploads", {})
+
+    def save(self):
+        data = {
+            "site_url": self.site_url,
+            "files": self.files,
+            "courses": self.courses,
+            "lessons": self.lessons,
+            "uploads": self.uploads
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(data, indent=1, sort_keys=True))
+
+    def get_hash(self, path: Path) -> Optional[str]:
+        """Returns the content hash of the file, or None if it doesn't exist.
+
+        The hash is read from the manifest if the mtime and size of the file
+        are same as the last time it was hashed.
+        """
+        key = str(path)
+        try:
+            st = Path(path).stat()
+        except FileNotFoundError:
+            self.files.pop(key, None)
+            return None
+
+        entry = self.files.get(key)
+        if entry and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            return entry["hash"]
+
+        h = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+        self.files[key] = {"mtime": st.st_mtime_ns, "size": st.st_size, "hash": h}
+        return h
+
+    def is_course_dirty(self, name, path: Path) -> bool:
+        """Tells if the course.yml at path has changed since the course was last pushed.
+        """
+        pushed = self.courses.get(name)
+        if pushed is None or pushed["hash"] != self.get_hash(path):
+            return True
+        preview_image = pushed.get("preview_image")
+        return bool(preview_image) and pushed.get("preview_image_hash") != self.get_hash(preview_image)
+
+    def is_lesson_dirty(self, path: Path) -> bool:
+        pushed = self.lessons.get(str(path))
+        return pushed is None or pushed["hash"] != self.get_hash(path)
+
+    def get_dirty_lessons(self, name) -> List[Path]:
+        """Returns the lessons of the course that have changed since they were
+        last pushed.
+
+        The lessons are taken from the last push of the course, so this is only
+        meaningful when the course.yml hasn't changed.
+        """
+        pushed = self.courses.get(name)
+        lessons = pushed["lessons"] if pushed else []
+        return [Path(p) for p in lessons if self.is_lesson_dirty(p)]
+
+    def mark_course_pushed(self, course):
+        """Records the course and all its lessons as pushed.
+        """
+        chapters = [] if course.draft else course.chapters
+        lessons = [course.root / str(p) for c in chapters for p in c.lessons]
+
+        path = course.root / "course.yml"
+        preview_image = course.preview_image and course.root / course.preview_image
+        self.courses[course.name] = {
+            "path": str(path),
+            "hash": self.get_hash(path),
+            "lessons": [str(p) for p in lessons],
+            "preview_image": preview_image and str(preview_image),
+            "preview_image_hash": preview_image and self.get_hash(preview_image)
+        }
+        for path in lessons:
+            self.lessons[str(path)] = {
+                "docname": path.stem + "-" + course.suffix,
+                "hash": self.get_hash(path)
+            }
+
+    def mark_lesson_pushed(self, lesson):
+        self.lessons[str(lesson.path)] = {
+            "docname": lesson.docname,
+            "hash": self.get_hash(lesson.path)
+        }
+
+    def get_upload(self, key, path: Path) -> Optional[dict]:
+        """Returns the upload recorded for the key, if the file at path hasn't
+        changed since it was uploaded.
+        """
+        upload = self.uploads.get(key)
+        if upload and upload["hash"] == self.get_hash(path):
+            return upload
+
+    def mark_uploaded(self, key, path: Path, file_url):
+        self.uploads[key] = {"hash": self.get_hash(path), "file_url": file_url}
@@ -3,41 +3,62 @@ monctl.nav
 ~~~~~~~~~~
 
 Hooks for injecting navigation to mkdocs.
+
+The navigation of every course is cached across builds, keyed on the mtime
+and hash of its course.yml, so that live-reload rebuilds under `mkdocs serve`
+only rebuild the navigation of the courses that have changed.
 """
-import yaml
-from pathlib import Path
-
-class Course:
-    def __init__(self, root, name):
-        self.root = root / "courses" / name
-        self.name = name
-        self.data = self.read_course_yaml()
-
-    def read_course_yaml(self):
-        path = self.root / "course.yml"
-        return yaml.safe_load(path.open())
-
-    def make_nav(self):
-        title = self.data['title']
-        nav_chapters = [self.make_chapter_nav(chapter) for chapter in self.data['chapters']]
-        return {title: nav_chapters}
-
-    def make_chapter_nav(self, chapter):
-        title = chapter['title']
-        nav_lessons = [self.make_lesson_nav(lesson) for lesson in chapter['lessons']]
-        return {title: nav_lessons}
-
-    def make_lesson_nav(self, lesson):
-        return f"{self.name}/{lesson}"
-
-def list_courses():
-    root = Path(".")
-    for p in root.joinpath("courses").iterdir():
-        if p.is_dir() and p.joinpath("course.yml").exists():
-            yield Course(root, p.name)
+import hashlib
+import logging
+import time
+
+from .workspace import Course, Workspace
+
+log = logging.getLogger("mkdocs.monctl.nav")
+
+# path of course.yml -> (mtime, hash, nav)
+_nav_cache = {}
+
+def make_nav(course: Course):
+    nav_chapters = [make_chapter_nav(course, chapter) for chapter in course.chapters]
+    return {course.title: nav_chapters}
+
+def make_chapter_nav(course: Course, chapter):
+    nav_lessons = [f"{course.name}/{lesson}" for lesson in chapter.lessons]
+    return {chapter.title: nav_lessons}
+
+def get_course_nav(w: Workspace, name):
+    """Returns the navigation of the course and a flag telling if it was rebuilt.
+    """
+    path = w.root / name / "course.yml"
+    mtime = path.stat().st_mtime_ns
+    entry = _nav_cache.get(str(path))
+    if entry and entry[0] == mtime:
+        return entry[2], False
+
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    if entry and entry[1] == digest:
+        _nav_cache[str(path)] = (mtime, digest, entry[2])
+        return entry[2], False
+
+    nav = make_nav(w.read_course(name))
+    _nav_cache[str(path)] = (mtime, digest, nav)
+    return nav, True
 
 def on_files(files, config):
     """This is called by mkdocs and is used to dynamically generate navigation for the website.
     """
-    courses = list_courses()
-    config['nav'] = [course.make_nav() for course in courses]
+    start = time.perf_counter()
+    w = Workspace(config['docs_dir'])
+    results = []
+    for name in w.list_courses():
+        try:
+            results.append(get_course_nav(w, name))
+        except Exception as e:
+            # a course.yml that is being edited shouldn't break the whole site
+            log.warning(f"Skipping the navigation of course {name}: {e!r}")
+    config['nav'] = [nav for nav, rebuilt in results]
+
+    elapsed = (time.perf_counter() - start) * 1000
+    rebuilt = sum(rebuilt for nav, rebuilt in results)
+    log.info(f"Navigation for {len(results)} courses ({rebuilt} rebuilt) took {elapsed:.1f} ms")
@@ -0,0 +1,97 @@
+"""
+monctl.profiling
+~~~~~~~~~~~~~~~~
+
+Timing instrumentation for push.
+
+The profiler counts the HTTP calls made and the bytes sent and received,
+and records the time taken by each phase (parse, fetch, diff, upload) and by
+every document saved. It is disabled by default and is enabled by the
+`--profile` flag of the CLI.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# number of slowest documents to report
+SLOWEST_DOCS = 10
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        self.http_calls = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        # phase -> seconds
+        self.phases = {}
+        # (seconds, doctype, name)
+        self.docs = []
+
+    def enable(self):
+        self.enabled = True
+
+    def install(self, session):
+        """Installs the profiler on the requests session to count the HTTP calls.
+        """
+        session.hooks["response"].append(self.on_response)
+
+    def on_response(self, response, *args, **kwargs):
+        if not self.enabled:
+            return
+        body = response.request.body or b""
+        with self.lock:
+            self.http_calls += 1
+            self.bytes_sent += len(body)
+            self.bytes_received += len(response.content)
+
+    @contextmanager
+    def phase(self, name):
+        """Records the time taken by the phase.
+
+        The time of a phase nested in another, like parsing the lessons while
+        diffing, is not counted in the outer phase.
+        """
+        # time taken by the nested phases of each active phase of this thread
+        stack = self.local.__dict__.setdefault("stack", [])
+        stack.append(0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            if self.enabled:
+                with self.lock:
+                    self.phases[name] = self.phases.get(name, 0) + elapsed - nested
+
+    @contextmanager
+    def doc(self, doctype, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                elapsed = time.perf_counter() - start
+                with self.lock:
+                    self.docs.append((elapsed, doctype, name))
+
+    def print(self):
+        print("--- profile ---")
+        print(f"http calls: {self.http_calls}")
+        print(f"bytes sent: {self.bytes_sent}, received: {self.bytes_received}")
+        for name, seconds in self.phases.items():
+            print(f"{name}: {seconds:.3f}s")
+        if self.docs:
+            print("slowest docs:")
+            for seconds, doctype, name in sorted(self.docs, reverse=True)[:SLOWEST_DOCS]:
+                print(f"    {seconds:.3f}s {doctype} {name}")
+
+# profiler used by the CLI
+profiler = Profiler()
@@ -0,0 +1,291 @@
+"""
+monctl.sync
+~~~~~~~~~~~
+
+Plan the changes needed to bring mon.school in sync with the workspace.
+
+The remote state is fetched in bulk, a few `get_list` calls per push, and
+diffed against the workspace in memory. Only the documents that are missing
+or different end up in the plan.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List
+
+from .profiling import profiler
+from .workspace import Course, Lesson
+
+DEFAULTS = {
+    "LMS Course": {
+        "title": "-",
+        "short_introduction": "-",
+        "description": "-"
+    },
+    "Course Chapter": {
+        "title": "-",
+        "description": "-"
+    },
+    "Course Lesson": {
+        "title": "-",
+        "body": "-"
+    }
+}
+
+# fields fetched for each doctype
+FIELDS = {
+    "LMS Course": ["title", "short_introduction", "description", "instructor",
+                   "is_published", "upcoming", "tags", "video_link", "image"],
+    "Course Chapter": ["course", "title", "description"],
+    "Course Lesson": ["chapter", "title", "body", "include_in_preview"],
+}
+
+# child table of each doctype, as (fieldname, child doctype, link field)
+CHILD_TABLES = {
+    "LMS Course": ("chapters", "Chapter Reference", "chapter"),
+    "Course Chapter": ("lessons", "Lesson Reference", "lesson"),
+}
+
+PAGE_LENGTH = 500
+
+# stages in which the changes are applied. All changes in one stage are
+# independent of each other, but may depend on the changes of earlier stages.
+STAGE_CREATE_COURSE = 0
+STAGE_CREATE_CHAPTER = 1
+STAGE_LESSON = 2
+STAGE_CHAPTER = 3
+STAGE_COURSE = 4
+
+def iter_pages(frappe, doctype, fields, filters, order_by="name asc"):
+    """Yields the matching records of doctype, a page at a time.
+    """
+    start = 0
+    while True:
+        page = frappe.get_list(doctype,
+            fields=fields,
+            filters=filters,
+            limit_start=start,
+            limit_page_length=PAGE_LENGTH,
+            order_by=order_by)
+        yield page
+        if len(page) < PAGE_LENGTH:
+            return
+        start += len(page)
+
+def get_all(frappe, doctype, fields, filters, order_by="name asc"):
+    """Returns all the matching records of doctype.
+    """
+    return [row for page in iter_pages(frappe, doctype, fields, filters, order_by) for row in page]
+
+class RemoteState:
+    """Snapshot of the courses, chapters and lessons on mon.school.
+    """
+    def __init__(self, docs=None, users=None):
+        # (doctype, name) -> doc
+        self.docs = docs or {}
+        # username -> name of the User
+        self.users = users or {}
+
+    @classmethod
+    def fetch(cls, frappe, courses: List[Course]=(), lessons: List[Lesson]=()) -> RemoteState:
+        """Fetches the remote state of the given courses and lessons in bulk.
+
+        For every course, all its chapters and lessons are fetched. For every
+        lesson, the lesson and its chapter and course are fetched.
+        """
+        course_names = {c.name for c in courses} | {l.chapter.course.name for l in lessons}
+        chapter_names = {c.docname for course in courses for c in course.chapters}
+        chapter_names |= {l.chapter.docname for l in lessons}
+
+        state = cls()
+        if course_names:
+            state.fetch_docs(frappe, "LMS Course", [["name", "in", sorted(course_names)]])
+        if chapter_names:
+            state.fetch_docs(frappe, "Course Chapter", [["name", "in", sorted(chapter_names)]])
+
+        full_chapters = sorted(c.docname for course in courses for c in course.chapters)
+        if full_chapters:
+            state.fetch_docs(frappe, "Course Lesson", [["chapter", "in", full_chapters]])
+
+        lesson_names = sorted({l.docname for l in lessons})
+        if lesson_names:
+            state.fetch_docs(frappe, "Course Lesson", [["name", "in", lesson_names]])
+
+        usernames = sorted({c.instructor for c in courses if c.instructor})
+        if usernames:
+            rows = get_all(frappe, "User", ["name", "username"], [["username", "in", usernames]])
+            state.users = {row["username"]: row["name"] for row in rows}
+        return state
+
+    def fetch_docs(self, frappe, doctype, filters):
+        """Fetches the docs matching the filters, along with their child table rows.
+        """
+        table = f"`tab{doctype}`"
+        fields = [f"{table}.name as name"] + [f"{table}.{f} as {f}" for f in FIELDS[doctype]]
+        order_by = f"{table}.name asc"
+
+        child = CHILD_TABLES.get(doctype)
+        if child:
+            fieldname, child_doctype, link_field = child
+            child_table = f"`tab{child_doctype}`"
+            fields += [f"{child_table}.{link_field} as _child", f"{child_table}.idx as _idx"]
+            order_by += f", {child_table}.idx asc"
+
+        filters = [[doctype] + f for f in filters]
+        rows = get_all(frappe, doctype, fields, filters, order_by)
+
+        # with a child table, there is one row for every child row
+        children = {}
+        for row in rows:
+            name = row['name']
+            if (doctype, name) not in self.docs:
+                self.docs[doctype, name] = {f: row.get(f) for f in ["name"] + FIELDS[doctype]}
+                children[name] = []
+            if child and row.get("_child") and name in children:
+                children[name].append((row["_idx"], row["_child"]))
+
+        if child:
+            for name, values in children.items():
+                self.docs[doctype, name][fieldname] = [{link_field: v} for idx, v in sorted(values)]
+
+    def get(self, doctype, name):
+        return self.docs.get((doctype, name))
+
+    def exists(self, doctype, name):
+        return (doctype, name) in self.docs
+
+    def resolve_username(self, username):
+        return self.users.get(username, "Administrator")
+
+@dataclass
+class Change:
+    """A document to be created or updated on mon.school.
+    """
+    action: str
+    doctype: str
+    name: str
+    doc: dict
+    course: str
+    stage: int
+
+class SyncPlan:
+    """The changes to bring mon.school in sync with the workspace.
+    """
+    def __init__(self, remote: RemoteState):
+        self.remote = remote
+        self.changes: List[Change] = []
+        self.unchanged: List[tuple] = []
+        # (doctype, name, stage) of the changes planned so far
+        self._planned = set()
+
+    def add_change(self, action, doctype, name, doc, course, stage):
+        if (doctype, name, stage) not in self._planned:
+            self._planned.add((doctype, name, stage))
+            self.changes.append(Change(action, doctype, name, doc, course, stage))
+
+    def save(self, doctype, name, doc, course, stage):
+        """Adds the doc to the plan if it is missing or different on mon.school.
+        """
+        old_doc = self.remote.get(doctype, name)
+        if old_doc is None:
+            self.add_change("create", doctype, name, doc, course, stage)
+        elif subdict(old_doc, doc.keys()) != doc:
+            self.add_change("update", doctype, name, doc, course, stage)
+        else:
+            self.unchanged.append((doctype, name, course))
+
+    def ensure(self, doctype, name, course_name, **fields):
+        """Adds a stub doc to the plan if the doc is missing on mon.school.
+
+        The stubs are required to satisfy the links between courses, chapters
+        and lessons, before the actual docs are saved.
+        """
+        if not self.remote.exists(doctype, name):
+            doc = dict(DEFAULTS[doctype], **fields)
+            stage = STAGE_CREATE_COURSE if doctype == "LMS Course" else STAGE_CREATE_CHAPTER
+            self.add_change("create", doctype, name, doc, course_name, stage)
+
+    def add_course(self, course: Course):
+        self.ensure("LMS Course", course.name, course.name)
+        for chapter in course.chapters:
+            self.ensure("Course Chapter", chapter.docname, course.name, course=course.name)
+
+        for chapter in course.chapters:
+            with profiler.phase("parse"):
+                lessons = chapter.get_lessons()
+            for lesson in lessons:
+                self.save("Course Lesson", lesson.docname, lesson.get_doc(), course.name, STAGE_LESSON)
+
+        for chapter in course.chapters:
+            self.save("Course Chapter", chapter.docname, chapter.get_doc(), course.name, STAGE_CHAPTER)
+
+        doc = course.get_doc()
+        doc['instructor'] = self.remote.resolve_username(doc['instructor'])
+        self.save("LMS Course", course.name, doc, course.name, STAGE_COURSE)
+
+    def add_lesson(self, lesson: Lesson):
+        course = lesson.chapter.course
+        self.ensure("LMS Course", course.name, course.name)
+        self.ensure("Course Chapter", lesson.chapter.docname, course.name, course=course.name)
+        self.save("Course Lesson", lesson.docname, lesson.get_doc(), course.name, STAGE_LESSON)
+
+    def get_stages(self) -> List[List[Change]]:
+        """Returns the changes grouped by stage, in the order they need to be applied.
+        """
+        stages: Dict[int, List[Change]] = {}
+        for c in self.changes:
+            stages.setdefault(c.stage, []).append(c)
+        return [stages[k] for k in sorted(stages)]
+
+    def print(self):
+        for c in sorted(self.changes, key=lambda c: c.stage):
+            print(f"{c.action:8} {c.doctype:16} {c.name}")
+        print(f"{len(self.changes)} changes, {len(self.unchanged)} unchanged")
+
+class PushSummary:
+    """Summary of the changes pushed for every course.
+    """
+    def __init__(self, plan: SyncPlan):
+        # course -> {status: count}
+        self.counts: Dict[str, Dict[str, int]] = {}
+        # course -> errors
+        self.failed: Dict[str, List[str]] = {}
+        for doctype, name, course in plan.unchanged:
+            self.count(course, "unchanged")
+
+    def count(self, course, status):
+        counts = self.counts.setdefault(course, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    def add(self, change: Change, error=None):
+        if error:
+            self.add_error(change.course, f"{change.doctype} {change.name}", error)
+        else:
+            self.count(change.course, change.action + "d")
+
+    def add_error(self, course, what, error):
+        self.count(course, "failed")
+        self.failed.setdefault(course, []).append(f"{what}: {error}")
+
+    def is_failed(self, course):
+        return course in self.failed
+
+    def print(self):
+        statuses = ["created", "updated", "unchanged", "failed"]
+        for course, counts in sorted(self.counts.items()):
+            status = ", ".join(f"{counts[s]} {s}" for s in statuses if counts.get(s))
+            print(f"{course}: {status}")
+            for error in self.failed.get(course, []):
+                print("   ", error)
+
+def make_plan(remote: RemoteState, courses: List[Course]=(), lessons: List[Lesson]=()) -> SyncPlan:
+    """Makes the plan to push the given courses and lessons to mon.school.
+    """
+    plan = SyncPlan(remote)
+    for course in courses:
+        plan.add_course(course)
+    for lesson in lessons:
+        plan.add_lesson(lesson)
+    return plan
+
+def subdict(d, keys):
+    return {k: d[k] for k in keys if k in d}
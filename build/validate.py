@@ -0,0 +1,215 @@
+"""
+monctl.validate
+~~~~~~~~~~~~~~~
+
+Validates the courses in the workspace before anything is pushed.
+
+The courses are validated in parallel, one course per process, and each file
+is read only once. The checks across courses, like duplicate docnames, are
+done after all the courses are validated.
+"""
+from __future__ import annotations
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List
+
+import yaml
+
+from .workspace import Workspace
+
+# links and images in markdown, [text](target) or ![alt](target "title")
+RE_LINK = re.compile(r'!?\[[^\]]*\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"]*")?\s*\)')
+
+# the Image macro, {{ Image("name.png") }}
+RE_IMAGE_MACRO = re.compile(r'\{\{\s*Image\(\s*["\']([^"\']+)["\']\s*\)\s*\}\}')
+
+# directory of a course with the images used by the Image macro
+IMAGES_DIR = "_images"
+
+@dataclass
+class Problem:
+    course: str
+    path: str
+    message: str
+
+@dataclass
+class CourseResult:
+    """Result of validating a single course.
+    """
+    name: str
+    problems: List[Problem]
+    # (doctype, docname) -> path of the file defining it
+    docnames: Dict[tuple, str]
+    lessons: int = 0
+
+class Report:
+    """Report of validating all the courses.
+
+    When names are given, only the problems of those courses are reported,
+    including their docnames duplicated in any of the other courses.
+    """
+    def __init__(self, results: List[CourseResult], names=None):
+        self.results = [r for r in results if names is None or r.name in names]
+        self.problems = [p for r in self.results for p in r.problems]
+        self.problems += find_duplicate_docnames(results, names)
+
+    @property
+    def ok(self):
+        return not self.problems
+
+    def dict(self):
+        return {
+            "ok": self.ok,
+            "courses": len(self.results),
+            "lessons": sum(r.lessons for r in self.results),
+            "problems": [asdict(p) for p in self.problems]
+        }
+
+    def print(self):
+        for p in self.problems:
+            print(f"{p.path}: {p.message}")
+        lessons = sum(r.lessons for r in self.results)
+        print(f"{len(self.problems)} problems found in {len(self.results)} courses and {lessons} lessons")
+
+def validate_workspace(root, names=None, jobs=None) -> Report:
+    """Validates the given courses, or all the courses, of the workspace.
+
+    The courses are validated using a pool of `jobs` processes, which
+    defaults to the number of cores. When jobs is 1, they are validated in
+    the current process.
+    """
+    w = Workspace(root)
+    names = w.list_courses() if names is None else names
+    roots = [str(w.root)] * len(names)
+    jobs = jobs or os.cpu_count()
+
+    if jobs == 1 or len(names) <= 1:
+        results = list(map(validate_course, roots, names))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(names))) as executor:
+            results = list(executor.map(validate_course, roots, names))
+    return Report(results)
+
+def validate_course(root, name) -> CourseResult:
+    w = Workspace(root)
+    path = w.root / name / "course.yml"
+    result = CourseResult(name, problems=[], docnames={})
+
+    def error(path, message):
+        result.problems.append(Problem(name, str(path), message))
+
+    try:
+        # parsed once, read_course gets it from the cache
+        data = w.cache.get(path, lambda p: yaml.safe_load(p.read_text()))
+    except yaml.YAMLError as e:
+        error(path, f"invalid yaml: {e}")
+        return result
+
+    messages = check_course_data(data)
+    for message in messages:
+        error(path, message)
+    if messages:
+        return result
+
+    try:
+        course = w.read_course(name)
+    except KeyError as e:
+        error(path, f"missing field {e}")
+        return result
+
+    add_docname(result, "LMS Course", course.name, path)
+    if course.preview_image and not course.root.joinpath(course.preview_image).exists():
+        error(path, f"preview_image not found: {course.preview_image}")
+
+    for chapter in course.chapters:
+        add_docname(result, "Course Chapter", chapter.docname, path)
+        for p in chapter.lessons:
+            lesson_path = course.root / str(p)
+            add_docname(result, "Course Lesson", lesson_path.stem + "-" + course.suffix, lesson_path)
+            if not lesson_path.exists():
+                error(path, f"lesson not found: {p}")
+                continue
+
+            result.lessons += 1
+            try:
+                lesson = chapter.get_lesson(lesson_path.stem)
+            except KeyError as e:
+                error(lesson_path, f"missing field {e} in frontmatter")
+                continue
+            except Exception as e:
+                error(lesson_path, f"invalid frontmatter: {e}")
+                continue
+
+            for message in check_links(course.root, lesson_path, lesson.body):
+                error(lesson_path, message)
+    return result
+
+def check_course_data(data) -> List[str]:
+    """Checks that course.yml has the structure expected by read_course.
+    """
+    if not isinstance(data, dict):
+        return ["course.yml must be a mapping"]
+    chapters = data.get("chapters")
+    if not isinstance(chapters, list):
+        return ["chapters must be a list"]
+
+    problems = []
+    if "suffix" in data and not isinstance(data["suffix"], str):
+        problems.append("suffix must be a string")
+    for i, chapter in enumerate(chapters):
+        if not isinstance(chapter, dict):
+            problems.append(f"chapter {i+1} must be a mapping")
+        elif not isinstance(chapter.get("name"), str):
+            problems.append(f"chapter {i+1} must have a name")
+        elif not isinstance(chapter.get("lessons"), list):
+            problems.append(f"lessons of chapter {chapter.get('name', i+1)} must be a list")
+        elif not all(isinstance(p, str) for p in chapter["lessons"]):
+            problems.append(f"lessons of chapter {chapter.get('name', i+1)} must be paths")
+    return problems
+
+def add_docname(result: CourseResult, doctype, docname, path):
+    key = (doctype, docname)
+    if key in result.docnames:
+        result.problems.append(Problem(result.name, str(path),
+            f"duplicate {doctype} {docname}, also used by {result.docnames[key]}"))
+    else:
+        result.docnames[key] = str(path)
+
+def check_links(course_root: Path, path: Path, body: str) -> List[str]:
+    """Checks the relative links and Image macros in the lesson body.
+    """
+    problems = []
+    for target in RE_LINK.findall(body):
+        target = target.split("#")[0].split("?")[0]
+        if not target or "://" in target or target.startswith(("/", "mailto:")):
+            continue
+        if not path.parent.joinpath(target).exists():
+            problems.append(f"broken link: {target}")
+
+    for name in RE_IMAGE_MACRO.findall(body):
+        if not course_root.joinpath(IMAGES_DIR, name).exists():
+            problems.append(f"image not found: {IMAGES_DIR}/{name}")
+    return problems
+
+def find_duplicate_docnames(results: List[CourseResult], names=None) -> List[Problem]:
+    """Finds the docnames used in more than one course.
+
+    This happens when two courses have the same suffix. When names are given,
+    only the duplicates involving those courses are returned.
+    """
+    seen = {}
+    problems = []
+    for r in sorted(results, key=lambda r: r.name):
+        for (doctype, docname), path in r.docnames.items():
+            key = (doctype, docname)
+            if key in seen and seen[key][0] != r.name:
+                if names is not None and r.name not in names and seen[key][0] not in names:
+                    continue
+                problems.append(Problem(r.name, path,
+                    f"duplicate {doctype} {docname}, also used by {seen[key][1]}"))
+            else:
+                seen.setdefault(key, (r.name, path))
+    return problems
@@ -0,0 +1,141 @@
+"""
+monctl.watch
+~~~~~~~~~~~~
+
+Watch the workspace and push the changed lessons to mon.school.
+
+The watcher keeps one authenticated session and the workspace index alive
+between pushes. File-system notifications are collected and debounced, so
+that a burst of saves results in a single push of the affected lessons and
+courses.
+"""
+from __future__ import annotations
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from .workspace import Workspace
+
+# seconds to wait for more changes before pushing
+DEBOUNCE_DELAY = 0.3
+
+class Debouncer:
+    """Collects the paths added and calls the callback with all of them, once
+    no new path is added for `delay` seconds.
+
+    The callback is never called concurrently.
+    """
+    def __init__(self, delay, callback):
+        self.delay = delay
+        self.callback = callback
+        self.paths = set()
+        self.timer = None
+        self.lock = threading.Lock()
+        self.callback_lock = threading.Lock()
+
+    def add(self, path):
+        with self.lock:
+            self.paths.add(path)
+            if self.timer:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        with self.callback_lock:
+            with self.lock:
+                paths, self.paths = self.paths, set()
+            if paths:
+                self.callback(paths)
+
+# events that change a file, the others like opened and closed are ignored
+EVENT_TYPES = ["created", "modified", "moved"]
+
+class EventHandler(FileSystemEventHandler):
+    def __init__(self, debouncer: Debouncer):
+        self.debouncer = debouncer
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in EVENT_TYPES:
+            return
+        path = getattr(event, "dest_path", None) or event.src_path
+        self.debouncer.add(Path(path))
+
+class Watcher:
+    def __init__(self, api, w: Workspace, manifest=None, delay=DEBOUNCE_DELAY):
+        self.api = api
+        self.workspace = w
+        self.manifest = manifest
+        self.debouncer = Debouncer(delay, self.on_changes)
+
+    def find_affected(self, paths: Iterable[Path]):
+        """Returns the courses and lessons affected by the changed paths.
+
+        A changed course.yml or preview image affects the whole course and a
+        changed lesson file affects only that lesson. Other files are ignored,
+        as are the changes in courses whose course.yml can't be read.
+        """
+        courses, lessons = {}, {}
+        index = self.workspace.get_index()
+        for path in paths:
+            path = Path(path).resolve()
+            for name, error in index.errors.items():
+                if path.is_relative_to(self.workspace.root.joinpath(name).resolve()):
+                    print(f"ERROR: failed to read course {name}: {error!r}")
+            course = self.find_course(index, path)
+            if course:
+                courses[course.name] = course
+            elif path in index.paths and path.exists():
+                lessons[path] = index.find_lesson(path)
+
+        lessons = [l for l in lessons.values() if l.chapter.course.name not in courses]
+        courses = [c for c in courses.values() if not c.draft]
+        lessons = [l for l in lessons if not l.chapter.course.draft]
+        return courses, lessons
+
+    def find_course(self, index, path: Path):
+        for course in index.courses.values():
+            if path == course.root.joinpath("course.yml").resolve():
+                return course
+            if course.preview_image and path == course.root.joinpath(course.preview_image).resolve():
+                return course
+
+    def on_changes(self, paths):
+        start = time.perf_counter()
+        try:
+            courses, lessons = self.find_affected(paths)
+            if not courses and not lessons:
+                return
+            self.api.push(courses=courses, lessons=lessons)
+        except Exception as e:
+            print("ERROR:", e)
+            return
+
+        if self.manifest:
+            for course in courses:
+                self.manifest.mark_course_pushed(course)
+            for lesson in lessons:
+                self.manifest.mark_lesson_pushed(lesson)
+            self.manifest.save()
+        print(f"pushed in {time.perf_counter() - start:.2f}s")
+
+    def run(self):
+        """Watches the workspace until interrupted.
+        """
+        observer = Observer()
+        observer.schedule(EventHandler(self.debouncer), str(self.workspace.root), recursive=True)
+        observer.start()
+        print(f"watching {self.workspace.root} for changes, press Ctrl+C to stop")
+        try:
+            while observer.is_alive():
+                observer.join(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            observer.stop()
+            observer.join()
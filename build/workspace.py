@@ -11,27 +11,67 @@ from pathlib import Path
 import frontmatter
 import yaml
 
+class ParseCache:
+    """Cache of parsed files, invalidated when the mtime or size of the file changes.
+    """
+    def __init__(self):
+        # path -> (mtime, size, value)
+        self.entries = {}
+
+    def get(self, path: Path, parse):
+        """Returns the result of `parse(path)`, parsing the file only if it
+        has changed since it was last parsed.
+        """
+        st = path.stat()
+        key = path.resolve()
+        entry = self.entries.get(key)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+
+        value = parse(path)
+        self.entries[key] = (st.st_mtime_ns, st.st_size, value)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+
+# cache shared by all workspaces
+parse_cache = ParseCache()
+
 class Workspace:
     def __init__(self, root="courses"):
         self.root = Path(root)
-        self.cache = {}
+        self.cache = parse_cache
+        # course name -> (yaml data, course, index of the course)
+        self._courses = {}
+        self._index = None
 
     def read_yaml_file(self, path: Path):
-        if path not in self.cache:
-            self.cache[path] = yaml.safe_load(path.open())
-        data = self.cache[path]
+        data = self.cache.get(path, lambda p: yaml.safe_load(p.read_text()))
         return dict(data)
 
     def list_courses(self):
         return [p.name for p in self.root.iterdir() if p.joinpath("course.yml").exists()]
 
     def read_course(self, name: str) -> Course:
+        """Reads the course with the given name.
+
+        The course is parsed again only when its course.yml is changed.
+        """
         path = self.root.joinpath(name, "course.yml")
-        data = self.read_yaml_file(path)
+        data = self.cache.get(path, lambda p: yaml.safe_load(p.read_text()))
+        if name in self._courses and self._courses[name][0] is data:
+            return self._courses[name][1]
 
+        course = self.parse_course(path, dict(data))
+        self._courses[name] = (data, course, None)
+        self._index = None
+        return course
+
+    def parse_course(self, path: Path, data: dict) -> Course:
         course = Course(
             root=path.parent,
-            name=name,
+            name=path.parent.name,
             suffix=data['suffix'],
             title=data['title'],
             short_introduction=data['short_introduction'],
@@ -49,7 +89,6 @@ class Workspace:
         return course
 
     def parse_chapter(self, course: Course, data: dict) -> Chapter:
-        name = data['name'] + "-" + course.suffix
         return Chapter(
             name=data['name'],
             course=course,
@@ -58,12 +97,86 @@ class Workspace:
             lessons=[Path(p) for p in data['lessons']]
         )
 
-    def read_lesson(self, path: Path):
-        chapter_name = path.parent.name
-        course_name = path.parent.parent.name
-        course = self.read_course(course_name)
-        chapter = course.get_chapter(chapter_name)
-        return chapter.get_lesson(path.stem)
+    def get_index(self) -> WorkspaceIndex:
+        """Returns the index of all the courses in the workspace.
+
+        The index is built again only when a course.yml is added or changed.
+        Courses that can't be read are left out of the index and the errors
+        are available as `index.errors`.
+        """
+        courses, errors = [], {}
+        for name in self.list_courses():
+            try:
+                courses.append(self.read_course(name))
+            except Exception as e:
+                errors[name] = e
+        if self._index is None or set(self._index.courses) != {c.name for c in courses}:
+            self._index = WorkspaceIndex(courses)
+        self._index.errors = errors
+        return self._index
+
+    def read_lesson(self, path: Path) -> Lesson:
+        """Reads the lesson at the given path.
+
+        Only the course of the lesson is read, so that a broken course
+        elsewhere in the workspace doesn't affect it.
+        """
+        path = Path(path)
+        return self.get_course_index(path.parent.parent.name).find_lesson(path)
+
+    def get_course_index(self, name: str) -> WorkspaceIndex:
+        """Returns the index of a single course.
+
+        The index is built again only when the course is parsed again.
+        """
+        course = self.read_course(name)
+        data, course, index = self._courses[name]
+        if index is None:
+            index = WorkspaceIndex([course])
+            self._courses[name] = (data, course, index)
+        return index
+
+    def find(self, docname: str):
+        """Returns the course, chapter or lesson with the given docname.
+        """
+        return self.get_index().find(docname)
+
+class WorkspaceIndex:
+    """Index of the courses, chapters and lessons of a workspace.
+
+    Lessons are indexed by path and docname, but they are read from the disk
+    only when they are looked up.
+    """
+    def __init__(self, courses: List[Course]):
+        self.courses = {c.name: c for c in courses}
+        # course name -> error, for the courses that couldn't be read
+        self.errors = {}
+        # resolved path -> (chapter, path)
+        self.paths = {}
+        # docname -> course, chapter or (chapter, path)
+        self.docnames = {}
+
+        for course in courses:
+            self.docnames[course.name] = course
+            for chapter in course.chapters:
+                self.docnames[chapter.docname] = chapter
+                for p in chapter.lessons:
+                    path = course.root.joinpath(str(p))
+                    self.paths[path.resolve()] = (chapter, path)
+                    self.docnames[path.stem + "-" + course.suffix] = (chapter, path)
+
+    def find_lesson(self, path: Path) -> Lesson:
+        """Reads the lesson at the given path.
+        """
+        chapter, path = self.paths[Path(path).resolve()]
+        return Lesson.from_file(chapter=chapter, path=path)
+
+    def find(self, docname: str):
+        value = self.docnames[docname]
+        if isinstance(value, tuple):
+            chapter, path = value
+            return Lesson.from_file(chapter=chapter, path=path)
+        return value
 
 @dataclass
 class Course:
@@ -214,9 +327,11 @@ class Lesson:
         return self.name + "-" + self.chapter.course.suffix
 
     @staticmethod
-    def from_file(chapter: Chapter, path: Path):
-        text = path.read_text()
-        data = frontmatter.loads(text)
+    def from_file(chapter: Chapter, path: Path, cache=True):
+        if cache:
+            data = parse_cache.get(path, lambda p: frontmatter.loads(p.read_text()))
+        else:
+            data = frontmatter.loads(path.read_text())
 
         return Lesson(
             chapter=chapter,
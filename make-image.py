@@ -1,25 +1,10 @@
 """
 Script to prepare the course image to fit into mon.school.
 
-The mon.school course images are displyed in two different sizes and often
-getting cropped if not enough care is taken.
-
-This script takes any image and generates a new image that works for both of those
-sizes.
-
-The sizes that are used in the mon school app are 348x168 and 350x200.
-
-To make the image work for both sizes, the image is resized to 340x170 and placed
-in the center of 350x200 image.
+This is the same as `python manage.py prepare-image source-image a.png`.
+See build/image.py for details.
 """
-from PIL import Image
 import sys
+from build.image import prepare_image
 
-im = Image.open(sys.argv[1])
-im.thumbnail((340, 170))
-
-im2 = Image.new(mode="RGBA", size=(350, 200), color=(0, 0, 0, 0))
-offset = (im2.width-im.width) // 2, (im2.height-im.height)//2
-im2.paste(im, offset)
-im2.save("a.png")
-print("saved the new image as a.png")
+prepare_image(sys.argv[1], "a.png")
@@ -0,0 +1,65 @@
+import pytest
+
+pytest.importorskip("frappeclient")
+
+from benchmarks.server import FakeFrappeServer
+from build.api import API, UPLOAD_FILE_PATH
+from .test_sync import make_workspace
+from .test_workspace import COURSE_YML, LESSON_TEXT
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeFrappeServer().start()
+    monkeypatch.setenv("MON_SCHOOL_URL", server.url)
+    monkeypatch.setenv("MON_SCHOOL_API_KEY", "key")
+    monkeypatch.setenv("MON_SCHOOL_API_SECRET", "secret")
+    yield server
+    server.stop()
+
+def add_course(tmp_path, name, suffix):
+    path = tmp_path / name / "course.yml"
+    path.parent.mkdir()
+    path.write_text(COURSE_YML.replace("suffix: pp", f"suffix: {suffix}").replace("Python", name))
+    for lesson in ["getting-started", "hello-world"]:
+        p = path.parent / "introduction" / f"{lesson}.md"
+        p.parent.mkdir(exist_ok=True)
+        p.write_text(LESSON_TEXT)
+
+class TestAPI:
+    def test_retries(self, server):
+        session = API(jobs=4).frappe.session
+        assert session.get_adapter(server.url + "/api/method/mon_school.api.save_document").max_retries.total == 5
+        assert session.get_adapter(server.url + UPLOAD_FILE_PATH).max_retries.total == 0
+
+    def test_push(self, server, tmp_path):
+        w = make_workspace(tmp_path)
+        add_course(tmp_path, "rust-primer", "rp")
+        courses = [w.read_course("python-primer"), w.read_course("rust-primer")]
+        server.frappe.failing.add(("Course Lesson", "hello-world-pp"))
+
+        with pytest.raises(Exception, match="Failed to push 1 courses"):
+            API(jobs=4).push(courses=courses)
+
+        # the stages of a course are saved in order
+        saved = server.frappe.saved
+        rp = [(doctype, name) for doctype, name in saved if name.endswith("rp") or name == "rust-primer"]
+        assert rp[0] == ("LMS Course", "rust-primer")
+        assert rp[-1] == ("LMS Course", "rust-primer")
+        assert rp.index(("Course Lesson", "hello-world-rp")) > rp.index(("Course Chapter", "introduction-rp"))
+        assert server.frappe.get_doc("LMS Course", "rust-primer")["title"] == "rust-primer Primer"
+
+        # the later stages of the failed course are skipped
+        assert ("Course Lesson", "getting-started-pp") in saved
+        assert saved.count(("LMS Course", "python-primer")) == 1
+        assert server.frappe.get_doc("LMS Course", "python-primer")["title"] == "-"
+
+        # only the failed docs are saved again
+        server.frappe.failing.clear()
+        server.frappe.saved.clear()
+        API(jobs=4).push(courses=courses)
+        assert sorted(server.frappe.saved) == [
+            ("Course Chapter", "datatypes-pp"),
+            ("Course Chapter", "introduction-pp"),
+            ("Course Lesson", "hello-world-pp"),
+            ("LMS Course", "python-primer"),
+        ]
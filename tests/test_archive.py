@@ -0,0 +1,72 @@
+import base64
+from types import SimpleNamespace
+
+import pytest
+
+from build import archive, workspace
+from .test_sync import FakeFrappe, make_workspace
+
+class TestArchive:
+    def test_export_import(self, tmp_path):
+        (tmp_path / "src").mkdir()
+        w = make_workspace(tmp_path / "src")
+        course_root = tmp_path / "src" / "python-primer"
+        (course_root / "_images").mkdir()
+        (course_root / "_images" / "hello.png").write_bytes(b"png")
+
+        path = tmp_path / "courses.jsonl.gz"
+        count = archive.write_archive(path, archive.export_workspace(w))
+        assert count == 4
+        assert [r["type"] for r in archive.read_archive(path)] == ["course", "lesson", "lesson", "file"]
+
+        names = archive.import_archive(path, tmp_path / "dest")
+        assert names == ["python-primer"]
+
+        w2 = workspace.Workspace(str(tmp_path / "dest"))
+        course = w.read_course("python-primer")
+        course2 = w2.read_course("python-primer")
+        assert course2.dict() == course.dict()
+
+        lessons = [l.dict() for c in course.chapters for l in c.get_lessons()]
+        lessons2 = [l.dict() for c in course2.chapters for l in c.get_lessons()]
+        assert lessons2 == lessons
+        assert (tmp_path / "dest" / "python-primer" / "_images" / "hello.png").read_bytes() == b"png"
+
+    def test_import_checks(self, tmp_path):
+        path = tmp_path / "courses.jsonl.gz"
+        archive.write_archive(path, [{"type": "course", "name": "../escaped"}])
+        with pytest.raises(Exception, match="Invalid course name"):
+            archive.import_archive(path, tmp_path / "dest")
+        assert not (tmp_path / "escaped").exists()
+
+        archive.write_archive(path, [{"type": "file", "course": "a", "path": "../../b", "data": ""}])
+        with pytest.raises(Exception, match="Invalid path"):
+            archive.import_archive(path, tmp_path / "dest")
+
+        # existing courses are overwritten only with force
+        w = make_workspace(tmp_path)
+        archive.write_archive(path, archive.export_workspace(w))
+        with pytest.raises(Exception, match="already exists"):
+            archive.import_archive(path, tmp_path)
+        assert archive.import_archive(path, tmp_path, force=True) == ["python-primer"]
+
+    def test_export_remote(self):
+        course = {"name": "python-primer", "title": "Python Primer", "short_introduction": "-",
+            "description": "-", "instructor": None, "is_published": 1, "upcoming": 0,
+            "tags": "python", "video_link": None, "image": "/files/preview.png"}
+        frappe = FakeFrappe({
+            "LMS Course": [dict(course, _child="introduction-pp", _idx=1)],
+            "Course Chapter": [{"name": "introduction-pp", "course": "python-primer", "title": "Introduction",
+                "description": "-", "_child": "hello-world-pp", "_idx": 1}],
+            "Course Lesson": [{"name": "hello-world-pp", "chapter": "introduction-pp", "title": "Hello",
+                "body": "Hello", "include_in_preview": 0}],
+        })
+        frappe.url = "https://mon.school"
+        frappe.session = SimpleNamespace(get=lambda url: SimpleNamespace(ok=True, content=b"png"))
+
+        records = list(archive.export_remote(frappe))
+        assert [r["type"] for r in records] == ["course", "file", "lesson"]
+        assert records[0]["preview_image"] == "preview-image.png"
+        assert records[1]["path"] == "preview-image.png"
+        assert base64.b64decode(records[1]["data"]) == b"png"
+        assert records[2]["path"] == "introduction/hello-world.md"
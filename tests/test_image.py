@@ -0,0 +1,55 @@
+from pathlib import Path
+from types import SimpleNamespace
+from PIL import Image
+from build import image
+from .test_sync import make_workspace
+
+class TestImage:
+    def test_prepare_images(self, tmp_path):
+        source = tmp_path / "preview.png"
+        Image.new("RGB", (800, 600), "red").save(source)
+        lesson_image = tmp_path / "diagram.jpg"
+        Image.new("RGB", (2400, 600), "blue").save(lesson_image)
+
+        tasks = [
+            image.ImageTask(str(source), str(tmp_path / "out" / "preview"), "preview"),
+            image.ImageTask(str(lesson_image), str(tmp_path / "out" / "diagram"), "lesson"),
+        ]
+        cache_path = tmp_path / "images.json"
+        assert image.prepare_images(tasks, cache_path=cache_path, jobs=2) == (2, 0)
+        assert Image.open(tmp_path / "out" / "preview.webp").size == (350, 200)
+        assert Image.open(tmp_path / "out" / "diagram.png").size == (1200, 300)
+
+        # unchanged images are skipped
+        assert image.prepare_images(tasks, cache_path=cache_path) == (0, 2)
+
+        Image.new("RGB", (800, 600), "green").save(source)
+        assert image.prepare_images(tasks, cache_path=cache_path) == (1, 1)
+
+    def test_get_prepared_preview(self, tmp_path):
+        course = SimpleNamespace(name="python-primer", root=tmp_path, preview_image="preview.png")
+        Image.new("RGB", (800, 600), "red").save(tmp_path / "preview.png")
+        output_dir, cache_path = tmp_path / "out", tmp_path / "images.json"
+        assert image.get_prepared_preview(course, output_dir, cache_path) is None
+
+        image.prepare_images([image.get_preview_task(course, output_dir)], cache_path=cache_path, jobs=1)
+        path = image.get_prepared_preview(course, output_dir, cache_path)
+        assert path == output_dir / "python-primer" / "preview.png"
+
+        # a changed image is uploaded as it is until it is prepared again
+        Image.new("RGB", (800, 600), "green").save(tmp_path / "preview.png")
+        assert image.get_prepared_preview(course, output_dir, cache_path) is None
+
+    def test_find_images(self, tmp_path):
+        w = make_workspace(tmp_path)
+        images_dir = tmp_path / "python-primer" / "_images"
+        images_dir.mkdir()
+        Image.new("RGB", (10, 10), "red").save(images_dir / "foo.png")
+        Image.new("RGB", (10, 10), "blue").save(images_dir / "foo.jpg")
+
+        tasks = image.find_images(w, tmp_path / "out")
+        assert sorted(Path(t.dest).name for t in tasks) == ["foo.jpg", "foo.png"]
+
+        cache_path = tmp_path / "images.json"
+        assert image.prepare_images(tasks, cache_path=cache_path, jobs=1) == (2, 0)
+        assert image.prepare_images(tasks, cache_path=cache_path, jobs=1) == (0, 2)
@@ -0,0 +1,69 @@
+from build.manifest import Manifest
+from .test_sync import make_workspace
+
+class TestManifest:
+    def test_get_hash(self, tmp_path):
+        path = tmp_path / "a.md"
+        path.write_text("hello")
+
+        m = Manifest(tmp_path / "manifest.json")
+        h = m.get_hash(path)
+        assert h is not None
+
+        # the hash is not recomputed unless mtime or size changes
+        m.files[str(path)]["hash"] = "cached"
+        assert m.get_hash(path) == "cached"
+
+        path.write_text("hello world")
+        assert m.get_hash(path) not in [h, "cached"]
+        assert m.get_hash(tmp_path / "missing.md") is None
+
+    def test_dirty(self, tmp_path):
+        w = make_workspace(tmp_path)
+        course = w.read_course("python-primer")
+        course_path = course.root / "course.yml"
+
+        m = Manifest(tmp_path / "manifest.json")
+        assert m.is_course_dirty(course.name, course_path)
+
+        m.mark_course_pushed(course)
+        m.save()
+
+        m = Manifest(tmp_path / "manifest.json")
+        assert not m.is_course_dirty(course.name, course_path)
+        assert m.get_dirty_lessons(course.name) == []
+
+        path = course.root / "introduction" / "hello-world.md"
+        path.write_text("changed")
+        assert m.get_dirty_lessons(course.name) == [path]
+
+    def test_uploads(self, tmp_path):
+        path = tmp_path / "preview-image.png"
+        path.write_bytes(b"image")
+
+        m = Manifest(tmp_path / "manifest.json")
+        assert m.get_upload("LMS Course/python-primer/image", path) is None
+
+        m.mark_uploaded("LMS Course/python-primer/image", path, "/files/preview-image.png")
+        assert m.get_upload("LMS Course/python-primer/image", path)["file_url"] == "/files/preview-image.png"
+
+        path.write_bytes(b"new image")
+        assert m.get_upload("LMS Course/python-primer/image", path) is None
+
+    def test_site_url(self, tmp_path):
+        w = make_workspace(tmp_path)
+        course = w.read_course("python-primer")
+        course_path = course.root / "course.yml"
+
+        m = Manifest(tmp_path / "manifest.json", site_url="https://staging.mon.school/")
+        m.mark_course_pushed(course)
+        m.save()
+        assert not m.is_course_dirty(course.name, course_path)
+
+        # nothing has been pushed to the other site yet
+        m = Manifest(tmp_path / "manifest.json", site_url="https://mon.school/")
+        assert m.is_course_dirty(course.name, course_path)
+        assert m.get_dirty_lessons(course.name) == []
+
+        m = Manifest(tmp_path / "manifest.json", site_url="https://staging.mon.school")
+        assert not m.is_course_dirty(course.name, course_path)
@@ -0,0 +1,41 @@
+import os
+from build import nav
+from .test_workspace import COURSE_YML
+
+class TestNav:
+    def test_on_files(self, tmp_path):
+        path = tmp_path / "python-primer" / "course.yml"
+        path.parent.mkdir()
+        path.write_text(COURSE_YML)
+
+        config = {"docs_dir": str(tmp_path)}
+        nav.on_files([], config)
+        assert config['nav'] == [{
+            "Python Primer": [
+                {"Introduction": [
+                    "python-primer/introduction/getting-started.md",
+                    "python-primer/introduction/hello-world.md"
+                ]},
+                {"Datatypes": []}
+            ]
+        }]
+
+        # touching the file without changing it, reuses the nav
+        os.utime(path, ns=(0, 0))
+        assert nav.get_course_nav(nav.Workspace(str(tmp_path)), "python-primer")[1] is False
+
+        path.write_text(COURSE_YML.replace("title: Datatypes", "title: Data Types"))
+        nav.on_files([], config)
+        assert config['nav'][0]["Python Primer"][1] == {"Data Types": []}
+
+    def test_broken_course(self, tmp_path):
+        path = tmp_path / "python-primer" / "course.yml"
+        path.parent.mkdir()
+        path.write_text(COURSE_YML)
+        broken = tmp_path / "broken" / "course.yml"
+        broken.parent.mkdir()
+        broken.write_text("title: Broken\nchapters: []\n")
+
+        config = {"docs_dir": str(tmp_path)}
+        nav.on_files([], config)
+        assert [list(n) for n in config['nav']] == [["Python Primer"]]
@@ -0,0 +1,31 @@
+from build.profiling import Profiler
+
+class TestProfiler:
+    def test_profiler(self, capsys):
+        p = Profiler()
+        with p.phase("parse"):
+            pass
+        assert p.phases == {}
+
+        p.enable()
+        with p.phase("parse"):
+            pass
+        with p.doc("Course Lesson", "hello-world-pp"):
+            pass
+        assert list(p.phases) == ["parse"]
+        assert [(doctype, name) for t, doctype, name in p.docs] == [("Course Lesson", "hello-world-pp")]
+
+        p.print()
+        out = capsys.readouterr().out
+        assert "http calls: 0" in out
+        assert "Course Lesson hello-world-pp" in out
+
+    def test_nested_phases(self, monkeypatch):
+        times = iter([0, 1, 3, 10])
+        monkeypatch.setattr("build.profiling.time.perf_counter", lambda: next(times))
+        p = Profiler()
+        p.enable()
+        with p.phase("diff"):
+            with p.phase("parse"):
+                pass
+        assert p.phases == {"parse": 2, "diff": 8}
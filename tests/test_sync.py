@@ -0,0 +1,120 @@
+from build import workspace
+from build.sync import RemoteState, PushSummary, make_plan
+from .test_workspace import COURSE_YML, LESSON_TEXT
+
+def make_workspace(tmp_path):
+    path = tmp_path / "python-primer" / "course.yml"
+    path.parent.mkdir()
+    path.write_text(COURSE_YML)
+
+    for name in ["getting-started", "hello-world"]:
+        p = path.parent / "introduction" / f"{name}.md"
+        p.parent.mkdir(exist_ok=True)
+        p.write_text(LESSON_TEXT)
+    return workspace.Workspace(str(tmp_path))
+
+def make_remote(course):
+    docs = {}
+    doc = course.get_doc()
+    doc['instructor'] = "Administrator"
+    docs["LMS Course", course.name] = doc
+    for chapter in course.chapters:
+        docs["Course Chapter", chapter.docname] = chapter.get_doc()
+        for lesson in chapter.get_lessons():
+            docs["Course Lesson", lesson.docname] = lesson.get_doc()
+    return RemoteState(docs)
+
+class FakeFrappe:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def get_list(self, doctype, fields, filters, limit_start, limit_page_length, order_by):
+        self.calls.append(doctype)
+        rows = self.rows.get(doctype, [])
+        return rows[limit_start:limit_start+limit_page_length]
+
+class TestSyncPlan:
+    def test_new_course(self, tmp_path):
+        w = make_workspace(tmp_path)
+        course = w.read_course("python-primer")
+        plan = make_plan(RemoteState(), courses=[course])
+
+        changes = [(c.action, c.doctype, c.name) for c in plan.changes]
+        assert changes == [
+            ("create", "LMS Course", "python-primer"),
+            ("create", "Course Chapter", "introduction-pp"),
+            ("create", "Course Chapter", "datatypes-pp"),
+            ("create", "Course Lesson", "getting-started-pp"),
+            ("create", "Course Lesson", "hello-world-pp"),
+            ("create", "Course Chapter", "introduction-pp"),
+            ("create", "Course Chapter", "datatypes-pp"),
+            ("create", "LMS Course", "python-primer"),
+        ]
+        assert [len(stage) for stage in plan.get_stages()] == [1, 2, 2, 2, 1]
+
+    def test_no_changes(self, tmp_path):
+        w = make_workspace(tmp_path)
+        course = w.read_course("python-primer")
+        plan = make_plan(make_remote(course), courses=[course])
+        assert plan.changes == []
+        assert len(plan.unchanged) == 5
+
+    def test_changed_lesson(self, tmp_path):
+        w = make_workspace(tmp_path)
+        course = w.read_course("python-primer")
+        remote = make_remote(course)
+
+        path = tmp_path / "python-primer" / "introduction" / "hello-world.md"
+        path.write_text(LESSON_TEXT.replace("Getting Started with", "Hello"))
+        lesson = w.read_lesson(path)
+
+        plan = make_plan(remote, lessons=[lesson])
+        changes = [(c.action, c.doctype, c.name) for c in plan.changes]
+        assert changes == [("update", "Course Lesson", "hello-world-pp")]
+
+class TestRemoteState:
+    def test_fetch(self, tmp_path):
+        w = make_workspace(tmp_path)
+        course = w.read_course("python-primer")
+        frappe = FakeFrappe({
+            "LMS Course": [
+                dict(name="python-primer", title="Python Primer", _child="datatypes-pp", _idx=2),
+                dict(name="python-primer", title="Python Primer", _child="introduction-pp", _idx=1),
+            ],
+            "Course Chapter": [
+                dict(name="datatypes-pp", title="Datatypes", _child=None, _idx=None),
+            ],
+            "User": [dict(name="foobar@example.com", username="foobar")]
+        })
+        remote = RemoteState.fetch(frappe, courses=[course])
+
+        assert frappe.calls == ["LMS Course", "Course Chapter", "Course Lesson", "User"]
+        assert remote.get("LMS Course", "python-primer")["chapters"] == [
+            {"chapter": "introduction-pp"}, {"chapter": "datatypes-pp"}
+        ]
+        assert remote.get("Course Chapter", "datatypes-pp")["lessons"] == []
+        assert not remote.exists("Course Chapter", "introduction-pp")
+        assert remote.resolve_username("foobar") == "foobar@example.com"
+        assert remote.resolve_username("nobody") == "Administrator"
+
+class TestPushSummary:
+    def test_summary(self, tmp_path, capsys):
+        w = make_workspace(tmp_path)
+        course = w.read_course("python-primer")
+        remote = make_remote(course)
+        del remote.docs["Course Lesson", "hello-world-pp"]
+        remote.docs["Course Lesson", "getting-started-pp"]["title"] = "-"
+
+        plan = make_plan(remote, courses=[course])
+        summary = PushSummary(plan)
+        summary.add(plan.changes[0])
+        summary.add(plan.changes[1], Exception("timeout"))
+
+        assert summary.is_failed("python-primer")
+        summary.print()
+        out = capsys.readouterr().out
+        assert out.splitlines() == [
+            "python-primer: 1 updated, 3 unchanged, 1 failed",
+            "    Course Lesson hello-world-pp: timeout",
+        ]
@@ -0,0 +1,63 @@
+from build.validate import Report, validate_workspace
+from .test_workspace import COURSE_YML, LESSON_TEXT
+
+class TestValidate:
+    def test_validate(self, tmp_path):
+        path = tmp_path / "python-primer" / "course.yml"
+        path.parent.mkdir()
+        path.write_text(COURSE_YML.replace("preview_image: null", "preview_image: preview.png"))
+
+        lesson = path.parent / "introduction" / "getting-started.md"
+        lesson.parent.mkdir()
+        lesson.write_text(LESSON_TEXT + "\n[next](hello-world.md) [home](https://mon.school/)\n")
+        (path.parent / "introduction" / "hello-world.md").write_text(
+            LESSON_TEXT + '\n![x](../_images/x.png)\n{{ Image("y.png") }}\n')
+
+        path2 = tmp_path / "python-primer-2" / "course.yml"
+        path2.parent.mkdir()
+        path2.write_text(COURSE_YML.replace("introduction/hello-world.md", "introduction/missing.md"))
+        (path2.parent / "introduction").mkdir()
+        (path2.parent / "introduction" / "getting-started.md").write_text("no frontmatter")
+
+        path3 = tmp_path / "empty" / "course.yml"
+        path3.parent.mkdir()
+        path3.write_text("")
+
+        path4 = tmp_path / "bad-chapters" / "course.yml"
+        path4.parent.mkdir()
+        path4.write_text("chapters:\n  - introduction\n  - name: basics\n    lessons: basics/a.md\n")
+
+        report = validate_workspace(str(tmp_path), jobs=2)
+        root = str(tmp_path)
+        problems = sorted((p.path.replace(root, ""), p.message.replace(root, "")) for p in report.problems)
+        assert problems == [
+            ("/bad-chapters/course.yml", "chapter 1 must be a mapping"),
+            ("/bad-chapters/course.yml", "lessons of chapter basics must be a list"),
+            ("/empty/course.yml", "course.yml must be a mapping"),
+            ("/python-primer-2/course.yml",
+                "duplicate Course Chapter datatypes-pp, also used by /python-primer/course.yml"),
+            ("/python-primer-2/course.yml",
+                "duplicate Course Chapter introduction-pp, also used by /python-primer/course.yml"),
+            ("/python-primer-2/course.yml", "lesson not found: introduction/missing.md"),
+            ("/python-primer-2/introduction/getting-started.md",
+                "duplicate Course Lesson getting-started-pp, also used by /python-primer/introduction/getting-started.md"),
+            ("/python-primer-2/introduction/getting-started.md", "missing field 'title' in frontmatter"),
+            ("/python-primer/course.yml", "preview_image not found: preview.png"),
+            ("/python-primer/introduction/hello-world.md", "broken link: ../_images/x.png"),
+            ("/python-primer/introduction/hello-world.md", "image not found: _images/y.png"),
+        ]
+        assert not report.ok
+        assert report.dict()["lessons"] == 3
+
+        # duplicates with the other courses are reported for the selected courses
+        report2 = Report(report.results, ["python-primer"])
+        messages = sorted(p.message.replace(root, "") for p in report2.problems)
+        assert messages == [
+            "broken link: ../_images/x.png",
+            "duplicate Course Chapter datatypes-pp, also used by /python-primer/course.yml",
+            "duplicate Course Chapter introduction-pp, also used by /python-primer/course.yml",
+            "duplicate Course Lesson getting-started-pp, also used by /python-primer/introduction/getting-started.md",
+            "image not found: _images/y.png",
+            "preview_image not found: preview.png",
+        ]
+        assert [p.message for p in Report(report.results, ["empty"]).problems] == ["course.yml must be a mapping"]
@@ -0,0 +1,38 @@
+import threading
+from build.watch import Debouncer, Watcher
+from .test_sync import make_workspace
+
+class TestWatch:
+    def test_debouncer(self):
+        calls = []
+        done = threading.Event()
+
+        def callback(paths):
+            calls.append(paths)
+            done.set()
+
+        d = Debouncer(0.05, callback)
+        d.add("a.md")
+        d.add("b.md")
+        d.add("a.md")
+        assert done.wait(2)
+        assert calls == [{"a.md", "b.md"}]
+
+    def test_find_affected(self, tmp_path):
+        w = make_workspace(tmp_path)
+        root = tmp_path / "python-primer"
+
+        watcher = Watcher(api=None, w=w)
+        courses, lessons = watcher.find_affected([
+            root / "introduction" / "hello-world.md",
+            root / "introduction" / "notes.txt",
+        ])
+        assert courses == []
+        assert [l.docname for l in lessons] == ["hello-world-pp"]
+
+        courses, lessons = watcher.find_affected([
+            root / "introduction" / "hello-world.md",
+            root / "course.yml",
+        ])
+        assert [c.name for c in courses] == ["python-primer"]
+        assert lessons == []
@@ -8,7 +8,7 @@ suffix: pp
 short_introduction: Introduction to Python
 description: Practical introduction to Python
 instructor: foobar
-draft: false,
+draft: false
 is_published: true
 upcoming: true
 preview_image: null
@@ -104,3 +104,58 @@ class TestWorkspace:
             "include_in_preview": False,
             "body": "Getting Started with Python"
         }
+
+    def test_find(self, tmp_path):
+        path = tmp_path / "python-primer" / "course.yml"
+        path.parent.mkdir()
+        path.write_text(COURSE_YML.replace("introduction/hello-world.md", "basics/hello-world.md"))
+
+        path2 = path.parent.joinpath("basics", "hello-world.md")
+        path2.parent.mkdir()
+        path2.write_text(LESSON_TEXT)
+
+        w = workspace.Workspace(str(tmp_path))
+        lesson = w.read_lesson(path2)
+        assert lesson.chapter.name == "introduction"
+        assert lesson.docname == "hello-world-pp"
+
+        assert w.find("python-primer") is w.read_course("python-primer")
+        assert w.find("datatypes-pp").title == "Datatypes"
+        assert w.find("hello-world-pp").path == path2
+
+    def test_cache(self, tmp_path):
+        path = tmp_path / "python-primer" / "course.yml"
+        path.parent.mkdir()
+        path.write_text(COURSE_YML)
+
+        w = workspace.Workspace(str(tmp_path))
+        c = w.read_course("python-primer")
+        assert w.read_course("python-primer") is c
+        index = w.get_course_index("python-primer")
+        assert w.get_course_index("python-primer") is index
+
+        path.write_text(COURSE_YML.replace("Python Primer", "Python Primer 2"))
+        c2 = w.read_course("python-primer")
+        assert c2 is not c
+        assert c2.title == "Python Primer 2"
+        assert w.get_course_index("python-primer") is not index
+
+    def test_broken_course(self, tmp_path):
+        path = tmp_path / "python-primer" / "course.yml"
+        path.parent.mkdir()
+        path.write_text(COURSE_YML)
+
+        path2 = path.parent.joinpath("introduction", "getting-started.md")
+        path2.parent.mkdir()
+        path2.write_text(LESSON_TEXT)
+
+        broken = tmp_path / "broken" / "course.yml"
+        broken.parent.mkdir()
+        broken.write_text(COURSE_YML.replace("short_introduction:", "intro:"))
+
+        w = workspace.Workspace(str(tmp_path))
+        assert w.read_lesson(path2).docname == "getting-started-pp"
+
+        index = w.get_index()
+        assert list(index.courses) == ["python-primer"]
+        assert list(index.errors) == ["broken"]